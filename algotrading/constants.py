@@ -16,6 +16,18 @@ BACKTEST_CANDLES = 30000
 # The maximum spread we will allow for entering trades.
 MAX_ENTRY_SPREAD = 5
 
+# Keep prices as integer points (price * 10 ** digits) in backtest frames and tick buffers, floats only for display and orders.
+INTEGER_PRICES = False
+
+# Number of the newest streamed ticks kept per symbol.
+TICK_BUFFER_CAPACITY = 10000
+
+# Price decimal places of the RateInfoRecord CSV files (latest.csv) imported into the backtest store, 3 for GBPJPY.
+BACKTEST_CSV_DIGITS = 3
+
+# Seconds the cached getAllSymbols snapshot (contract size, lot step, precision...) is used before it is requested again.
+SYMBOL_CACHE_TTL = 86400
+
 
 ## Indicators
 TOGGLE_INDICATORS = True
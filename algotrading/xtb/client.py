@@ -10,6 +10,16 @@ from datetime import datetime
 from algotrading.xtb.xapi import xapi, exceptions
 from algotrading.xtb.xapi.records import *
 from algotrading.xtb.xapi.enums import TimeInt, PeriodCode, TradeDay
+from algotrading.xtb.xapi.columnar import ChartColumns, decode_chart_columns
+from algotrading.xtb.xapi.bars import BarBuilder
+from algotrading.xtb.xapi.backfill import BackfillResult, backfill
+from algotrading.xtb.xapi.history import HistoryCache
+from algotrading.xtb.xapi.store import ColumnStore, read_rate_info_csv
+from algotrading.xtb.xapi.framecache import FrameCache
+from algotrading.xtb.xapi.points import pip_points, spread_points
+from algotrading.xtb.xapi.ticks import TickRingBuffer, TickStore
+from algotrading.xtb.xapi.symbols import SymbolCache
+from algotrading.xtb.xapi.tradinghours import TradingCalendar
 from algotrading.constants import *
 
 # time = [TimeInt[time] for time in TimeInt.__dict__ if not str(time).startswith('_')][0]
@@ -41,10 +51,19 @@ class Client:
             "password":password,
             "host": "ws.xtb.com",
             "type": "demo",
-            "safe": False
+            "safe": False,
+            "auto_reconnect": True
         }
         
         self._last_symbol = None # The previous lagging symbol data
+        self.ticks = TickStore(TICK_BUFFER_CAPACITY) # Ring buffers of the newest streamed ticks per symbol
+        self.backtest_data_path = os.path.join(os.getcwd(), "algotrading", "backtest_data")
+        self.store = ColumnStore(os.path.join(self.backtest_data_path, "store")) # Candles partitioned by symbol, period and month
+        self.history = HistoryCache(self.store)
+        self.frames = FrameCache(os.path.join(self.backtest_data_path, "frames")) # Preprocessed backtest frames by content hash
+        self.trading_hours = TradingCalendar() # Trading sessions per symbol, refreshed once a day
+        self.bars = {} # BarBuilders per symbol, fed by the candle stream
+        self.symbols = SymbolCache(os.path.join(self.backtest_data_path, "symbols.json"), SYMBOL_CACHE_TTL) # SymbolRecords, kept on disk between runs
         
             
         logging.basicConfig(
@@ -66,14 +85,14 @@ class Client:
         return milliseconds
         
     async def get_symbol(self, connector:xapi.XAPI, symbol:str) -> SymbolRecord:
-        """ Returns a mapped 'SymbolRecord' version of symbol record data from connector.socket.getSymbol to output.
+        """ Returns the cached 'SymbolRecord' of a symbol if its tick time changed since the previous call.
 
         Args:
             xapi_connector (xapi.XAPI): The async context manager API connector.
             symbol (str): The symbol to get a Symbol Record for.
         """
-        new_symbol = await connector.socket.getSymbol(symbol)
-        new_symbol_record = SymbolRecord(**new_symbol['returnData'])
+        ## Static fields come from the cached getAllSymbols snapshot, quote fields and time from buffered stream ticks or getSymbol.
+        new_symbol_record = await self.symbols.get(connector.socket, symbol)
         
         ## Get the previous symbol before the next and prevent duplicate times.
         if self._last_symbol is None:
@@ -95,6 +114,39 @@ class Client:
         tick_price = await connector.stream.getTickPrices(symbol, maxLevel=6)
         # tick_price_record = TickRecord(**tick_price.get('data'))
         return tick_price
+
+    async def buffer_tick_prices(self, connector:xapi.XAPI, symbol:str) -> TickRingBuffer:
+        """ Subscribe to the tick prices of a symbol and copy every tick into its ring buffer in 'self.ticks'.
+        With INTEGER_PRICES the buffer holds integer points of the symbol precision.
+
+        Args:
+            connector (XAPI): the asynchronous context manager.
+            symbol (str): The symbol to buffer ticks for.
+        """
+
+        symbol_record = await self.symbols.get(connector.socket, symbol, quotes=False)
+        if INTEGER_PRICES and symbol not in self.ticks:
+            self.ticks.digits[symbol] = symbol_record.precision
+
+        await connector.stream.getTickPrices(symbol, callback=self._on_tick)
+        return self.ticks[symbol]
+
+    def _on_tick(self, tick):
+        """Stream callback of 'buffer_tick_prices', also feeds the quote fields of 'get_symbol' so it needs no getSymbol request."""
+        self.ticks.on_tick(tick)
+        self.symbols.on_tick(tick)
+
+    def is_entry_spread_allowed(self, symbol_record:SymbolRecord, tick:StreamTickRecord | dict) -> bool:
+        """ Return whether the spread of a tick is at most MAX_ENTRY_SPREAD pips, compared exactly in integer points.
+
+        Args:
+            symbol_record (SymbolRecord): The symbol the tick belongs to, for its precision and pips precision.
+            tick (StreamTickRecord | dict): The tick to check.
+        """
+
+        bid, ask = (tick['bid'], tick['ask']) if isinstance(tick, dict) else (tick.bid, tick.ask)
+        spread = spread_points(bid, ask, symbol_record.precision)
+        return spread <= MAX_ENTRY_SPREAD * pip_points(symbol_record.precision, symbol_record.pipsPrecision)
         
     async def get_last_request_data(self, connector:xapi.XAPI, symbol:str, period:PeriodCode, multiplier:int, timeframe:TimeInt = str) -> RateInfoRecord:
         """Get access to historical data over a timeframe and from a historical date.
@@ -112,115 +164,155 @@ class Client:
         start = 1000 * round(datetime.datetime.now().timestamp()) - (TimeInt[timeframe] * timeframeStartMultiplier)
         data = await connector.socket.getChartLastRequest(symbol, start, period)
         data = data.get('returnData')
+        ## A codec with 'typed_charts' already decoded the candles into a ChartRecord.
+        if isinstance(data, ChartRecord):
+            return data.rateInfos
         try:
-            return [RateInfoRecord(**info) for info in data.get('rateInfos')] 
+            return [RateInfoRecord.from_dict(info) for info in data.get('rateInfos')]
         except AttributeError:
-            self.logger.info("The params parsed cannot return the data you asked for. Try changing the period, multiplier or timeframe.") 
-    
-    
-    def __get_latest_file(self, path:str = None):
-        """Get the latest file in a directory. Due to this being a client for trading it defaults to the backtesting data directory.
+            self.logger.info("The params parsed cannot return the data you asked for. Try changing the period, multiplier or timeframe.")
+
+    async def get_last_request_columns(self, connector:xapi.XAPI, symbol:str, period:PeriodCode, multiplier:int, timeframe:TimeInt = str) -> ChartColumns:
+        """Same as 'get_last_request_data' but decodes the candles straight into NumPy columns instead of a RateInfoRecord per candle.
+
+        Args:
+            connector (XAPI): the asynchronous context manager.
+            symbol (str): The symbol to last request data for.
+            period (PeriodCode): The intraday chart period or period code.
+            multiplier (int): The amount of 'timeframe' to get historical data from.
+            timeframe (TimeInt) = str: The TimeInt timeframe.
+        """
+
+        start = 1000 * round(datetime.datetime.now().timestamp()) - (TimeInt[timeframe] * multiplier)
+        data = await connector.socket.getChartLastRequest(symbol, start, period)
+        data = data.get('returnData')
+        if data is None:
+            self.logger.info("The params parsed cannot return the data you asked for. Try changing the period, multiplier or timeframe.")
+            return
+        return decode_chart_columns(data)
+
+    async def backfill_data(self, connector:xapi.XAPI, symbol:str, period:PeriodCode, multiplier:int, timeframe:TimeInt = str) -> BackfillResult:
+        """Download 'multiplier' x 'timeframe' of history in concurrent getChartRangeRequest chunks.
+
+        Unlike 'get_last_request_data' the range is not truncated to the availability window of 'period', older
+        candles fall back to the finest coarser period still available (see 'result.periods').
+
+        Args:
+            connector (XAPI): the asynchronous context manager.
+            symbol (str): The symbol to backfill.
+            period (PeriodCode): The preferred chart period.
+            multiplier (int): The amount of 'timeframe' to get historical data from.
+            timeframe (TimeInt) = str: The TimeInt timeframe.
+        """
+
+        end = 1000 * round(datetime.datetime.now().timestamp())
+        start = end - (TimeInt[timeframe] * multiplier)
+        return await backfill(connector.socket, symbol, start, end, period, now=end, logger=self.logger)
+
+    async def update_historical_data(self, connector:xapi.XAPI, symbol:str, period:PeriodCode, multiplier:int, timeframe:TimeInt = str) -> ChartColumns:
+        """Same as 'get_last_request_data' but only downloads the candles newer than the ones stored in 'self.history'.
+
+        Args:
+            connector (XAPI): the asynchronous context manager.
+            symbol (str): The symbol to update historical data for.
+            period (PeriodCode): The intraday chart period or period code.
+            multiplier (int): The amount of 'timeframe' to get historical data from.
+            timeframe (TimeInt) = str: The TimeInt timeframe.
+        """
+
+        now = 1000 * round(datetime.datetime.now().timestamp())
+        start = now - (TimeInt[timeframe] * multiplier)
+        columns, _ = await self.history.refresh(connector.socket, symbol, period, start, now=now)
+        return columns
+
+    async def get_many_last_request_data(self, connector:xapi.XAPI, symbols:list[str], periods:list[PeriodCode], multiplier:int, timeframe:TimeInt = str) -> dict:
+        """Get historical data for every symbol and period combination concurrently.
+        With an 'XAPIPool' connector (xapi.connect(sessions=N)) the requests are spread over the pooled sessions.
 
         Args:
-            path (str, optional): The path to get the latest file from. Defaults to backtesting data path if None.
+            connector (XAPI): the asynchronous context manager.
+            symbols (list[str]): The symbols to last request data for.
+            periods (list[PeriodCode]): The intraday chart periods or period codes.
+            multiplier (int): The amount of 'timeframe' to get historical data from.
+            timeframe (TimeInt) = str: The TimeInt timeframe.
 
         Returns:
-            dict: The 'latest' file information metadata.
+            dict: RateInfoRecord lists keyed by (symbol, period).
+        """
+
+        keys = [(symbol, period) for symbol in symbols for period in periods]
+        results = await asyncio.gather(*(
+            self.get_last_request_data(connector, symbol, period, multiplier, timeframe) for symbol, period in keys
+        ))
+        return dict(zip(keys, results))
+
+    
+    def import_backtest_csv_data(self, file_name:str, digits:int, symbol:str = None, period:PeriodCode = TRADE_PERIOD):
+        """Import a CSV file of RateInfoRecords from the backtest data directory into the backtest store.
+
+        Args:
+            file_name (str): The CSV file name in the backtest data directory.
+            digits (int): The number of price decimal places of the symbol, e.g. 3 for GBPJPY.
+            symbol (str, optional): The symbol the file holds. Defaults to 'self.symbol'.
+            period (PeriodCode, optional): The period of the candles in the file. Defaults to TRADE_PERIOD.
+        """
+
+        columns = read_rate_info_csv(os.path.join(self.backtest_data_path, file_name), digits)
+        self.store.write(symbol or self.symbol, period, columns)
+
+    def write_backtest_ohlcv_data(self, historical_data:list[RateInfoRecord] | ChartColumns, digits:int = None):
+        """Write OHLCV historical data to the backtest store, partitioned by month under 'self.symbol' and TRADE_PERIOD.
+
+        Args:
+            historical_data (list[RateInfoRecord] | ChartColumns): The candles to store.
+            digits (int, optional): The number of price decimal places, required for RateInfoRecords which do not carry it.
         """
-        ## Sets the latest backtest to latest.csv and updates the previous to the file date.
-        if path is None:
-            file_path = f"{os.getcwd()}\\algotrading\\backtest_data\\"
-        else:
-            file_path = path
-        
-        most_recent_file:str = None
-        most_recent_time = 0
-        for file in os.scandir(file_path):
-            if file.is_file():
-                creation_time = file.stat().st_ctime
-                if creation_time > most_recent_time:
-                    most_recent_file = file.name
-                    most_recent_time = creation_time
-        return {"file_name": most_recent_file, "creation_time": most_recent_time}
-        
-    def write_backtest_ohlcv_data(self, historical_data):
-        """Write OHLCV historical data to a comma seperated values file. """
 
         if GET_NEW_HISTORICAL_DATA == True:
-            file_path = f"{os.getcwd()}\\algotrading\\backtest_data\\"
-            file_name = "latest.csv"
-            latest_file = self.__get_latest_file()
-            latest_file_name = latest_file['file_name']
-            latest_file_time = latest_file['creation_time']
-            
+            if historical_data is None:
+                return
+
             if BACKTESTING == True:
-                if latest_file_name == file_name:
-                    ## Update old 'latest.csv' file to creation date.
-                    latest_file_time = datetime.datetime.fromtimestamp(latest_file_time).strftime("%d.%m.%Y - %H.%M.%S")
-                    new_file_name = f"{self.symbol} {PeriodCode(TRADE_PERIOD).name} {latest_file_time}.csv"
-                    os.rename(file_path+latest_file_name, file_path+new_file_name)
-
-                    ## Write new data to latest.csv file
-                    try:
-                        df = pd.DataFrame(historical_data)
-                        df = df[['ctmString', 'ctm', 'open', 'high', 'low', 'close', 'vol']]
-                        df.to_csv(file_path + file_name, index=False)
-                    except KeyError:
-                        return
-                
-                ## If latest_file_name is not file_name or no latest.csv found then make the latest the file.
-                if latest_file_name != file_name:
-                    if not os.path.isfile(file_path+file_name):
-                        ## If no file exists then create an empty instance of latest.csv.
-                        try:
-                            df = pd.DataFrame(historical_data)
-                            df = df[['ctmString', 'ctm', 'open', 'high', 'low', 'close', 'vol']]
-                            df.to_csv(file_path + file_name, index=False)
-                        except KeyError:
-                            return
-                            
-                try:
-                    os.rename(file_path+latest_file_name, file_path+file_name)
-                except TypeError:
-                    return
+                if not isinstance(historical_data, ChartColumns):
+                    if digits is None:
+                        raise ValueError("digits is required to store RateInfoRecords")
+                    historical_data = decode_chart_columns(ChartRecord(digits, historical_data))
+                self.store.write(self.symbol, TRADE_PERIOD, historical_data)
             else:
                 ## Unlikely to throw due to pre-determined checks but if it does, no file writing can be invoked because backtesting is false.
                 self.logger.info(f"You cannot write historical data to a file because BACKTESTING is set to {BACKTESTING}.")
             
             return
         
+    def open_backtest_data(self, start:int = None, end:int = None, symbol:str = None, period:PeriodCode = TRADE_PERIOD) -> ChartColumns:
+        """Return the stored candles between 'start' and 'end' (milliseconds) as views into the memory-mapped series, without copying or parsing.
+
+        Args:
+            start (int, optional): The first candle time. Defaults to the oldest stored candle.
+            end (int, optional): The exclusive end time. Defaults to after the newest stored candle.
+            symbol (str, optional): The symbol to open. Defaults to 'self.symbol'.
+            period (PeriodCode, optional): The candle period. Defaults to TRADE_PERIOD.
+        """
+
+        return self.store.open(symbol or self.symbol, period).between(start, end)
+
     async def get_backtest_ohlcv_data(self) -> pd.DataFrame:
-        """ Async function of getting ohlcv data from file. We need to coroutine this to make sure all data is accounted for appropriately. """
-        
-        file = self.__get_latest_file()
-        file_path = f"{os.getcwd()}\\algotrading\\backtest_data\\"
-        file_name = file['file_name']
-        file = pd.read_csv(file_path+file_name)
-        df = file
-        df = df.rename(columns={
-            'open' : 'Open',
-            'high' : 'High',
-            'low' : 'Low',
-            'close' : 'Close',
-            'vol' : 'Volume'
-            })
-        
-        ## Pre-process the data before returning a dataframe.
-        df = df.drop(['ctm'], axis=1)
-        df['ctmString'] = pd.to_datetime(df['ctmString'], format='%b %d, %Y, %I:%M:%S %p')
-        df['Date'] = df['ctmString'].dt.date
-        df['Date'] = pd.to_datetime(df['Date'])
-        df['Time'] = df['ctmString'].dt.time
-        df.drop(columns={'ctmString'}, inplace=True)
-        df.set_index('Date', inplace=True)
-        df.insert(0, 'Time', df.pop('Time'))
-        
-        ## Calculate the actual prices for Open, High, Low, Close.
-        df['High'] = (df['Open'] + (df['High']))/1000
-        df['Low'] = (df['Open'] + (df['Low']))/1000
-        df['Close'] = (df['Open'] + (df['Close']))/1000
-        df['Open'] = (df['Open'])/1000
-        return df
+        """ Async function of getting ohlcv data from the backtest store. We need to coroutine this to make sure all data is accounted for appropriately. """
+        
+        ## Backtest CSV files written before the store existed are imported the first time the store is empty.
+        if self.store.last_ctm(self.symbol, TRADE_PERIOD) is None and os.path.exists(os.path.join(self.backtest_data_path, "latest.csv")):
+            self.logger.info(f"Importing latest.csv into the backtest store for {self.symbol} {PeriodCode(TRADE_PERIOD).name}.")
+            self.import_backtest_csv_data("latest.csv", BACKTEST_CSV_DIGITS)
+        
+        columns = self.open_backtest_data()
+        if not len(columns):
+            self.logger.info(f"No backtest data stored for {self.symbol} {PeriodCode(TRADE_PERIOD).name}. Set GET_NEW_HISTORICAL_DATA or use 'import_backtest_csv_data'.")
+            return
+
+        ## Prices are rebuilt from the integer columns and stored digits, and the Date/Time split from ctm, cached by content.
+        if INTEGER_PRICES:
+            return self.frames.get(columns, ChartColumns.to_ohlcv_points_frame)
+        return self.frames.get(columns, ChartColumns.to_ohlcv_frame)
     
     
     async def get_candles(self, connector:xapi.XAPI, symbol:str) -> StreamingCandleRecord:
@@ -228,12 +320,24 @@ class Client:
         
         await connector.stream.getCandles(symbol)
         
+    async def build_bars(self, connector:xapi.XAPI, symbol:str, callback = None) -> BarBuilder:
+        """ Subscribe to the 1 minute candles of a symbol and build bars of every PeriodCode from them in 'self.bars'.
+        
+        Args:
+            connector (XAPI): the asynchronous context manager.
+            symbol (str): The symbol to build bars for.
+            callback (Callable, optional): Called with every forming and closed Bar, e.g. the strategy on closed TRADE_PERIOD bars.
+        """
+        
+        if symbol not in self.bars:
+            self.bars[symbol] = BarBuilder(symbol, callback=callback)
+        await connector.stream.getCandles(symbol, callback=self.bars[symbol].on_candle)
+        return self.bars[symbol]
+        
     async def _get_trade_day(self, connector:xapi.XAPI):
-        """Return trade day of server time as integer of week. """
-        server_time = await connector.socket.getServerTime()
-        epoch_time = int(str(server_time.get('returnData')['time'])[:-3]) # removed milliseconds.
-        trade_day = datetime.datetime.fromtimestamp(epoch_time).isoweekday()
-        return trade_day
+        """Return trade day of server time in CET / CEST as integer of week. """
+        clock = await connector.start_clock()
+        return clock.trade_day().value
         
     async def get_server_day(self, connector:xapi.XAPI) -> TradeDay:
         """Returns datetime.isoweekday as a dictionary of TradeDay. """
@@ -281,56 +385,29 @@ class Client:
             You can see that the market on day 7 (Sunday) is open but not for long which is why a live algorithm would be useless to implement on that particular day.
         """
         
-        server_day = await self.get_server_day(connector)
-        trading_hours = await connector.socket.getTradingHours(symbol)
-        
-        server_time = await connector.socket.getServerTime()
-        epoch_time = int(str(server_time.get('returnData')['time'])[:-3])
-        server_intraday_hour = datetime.datetime.fromtimestamp(epoch_time).hour
-        
-        #if ((server_intraday_hour >= MIN_TRADING_INTRADAY_HOUR) and (server_intraday_hour <= MAX_TRADING_INTRADAY_HOUR)) or (BACKTESTING == True)
-        # removed backtesting because if trading in forwards time backtesting is not a required param.
-        if ((server_intraday_hour >= MIN_TRADING_INTRADAY_HOUR) and (server_intraday_hour <= MAX_TRADING_INTRADAY_HOUR)):
-            for i in range(len(trading_hours.trading)):
-                trading_record = TradingRecord(**trading_hours.trading[i])
-                if server_day['day'] == trading_record.day:
-                    max_trading_intraday_hour = int(trading_record.toT/1000/60/60 - 1)
-                    
-                    ## Remaining trading hours left until rollover fees. From 23 to 0 then resets.
-                    rollover_occurance = max_trading_intraday_hour - server_intraday_hour
-                    if rollover_occurance == 0:
-                        ## Prevent NEW trades from being rolled over. This does not prevent active trades from accumulating fees.
-                        self.logger.info(f"Sorry I cannot allow trades to accumulate rollover fees. ¯\_(ツ)_/¯")
-                        return False
-                    
-                    if VERBOSE:
-                        self.logger.info(f"Trading {self.symbol} between hours {MIN_TRADING_INTRADAY_HOUR} and {MAX_TRADING_INTRADAY_HOUR}")
-                    return True
-        else:
-            ## Server time is either above or below our constant range limit so make new checks.
-            if OVERRIDE_TRADING_INTRADAY_RANGE:
-                for i in range(len(trading_hours.trading)):
-                    trading_record = TradingRecord(**trading_hours.trading[i])
-                    if server_day['day'] == trading_record.day:
-                        
-                        ## Format the trading intraday max hour
-                        ## We have to minus an hour due to datetime epoch hour starting at 0.
-                        max_trading_intraday_hour = int(trading_record.toT/1000/60/60 - 1)
-                        
-                        ## Remaining trading hours left until rollover fees. From 23 to 0 then resets.
-                        rollover_occurance = max_trading_intraday_hour - server_intraday_hour
-                        if rollover_occurance == 0:
-                            ## Prevent NEW trades from being rolled over. This does not prevent active trades from accumulating fees.
-                            self.logger.info(f"Sorry I cannot allow trades to accumulate rollover fees. ¯\_(ツ)_/¯")
-                            return False
-                        
-                        ## Check if trading is still allowed below our max trading intraday hour.
-                        if server_intraday_hour < max_trading_intraday_hour:
-                            if VERBOSE:
-                                self.logger.info(f"OVERRIDE_TRADING_INTRADAY_RANGE has been enabled for {self.symbol}. FBI will be at your door soon. ¯\_(ツ)_/¯")
-                            return True
-                        
-        return False
+        ## Trading hours are requested once per symbol and CET day, the checks below are lookups in memory.
+        ## The server time is estimated locally from periodic getServerTime samples.
+        clock = await connector.start_clock()
+        now = clock.server_now()
+        hours = await self.trading_hours.get(connector.socket, symbol, now)
+        server_intraday_hour = clock.server_datetime(now).hour
+        
+        ## Server time is either above or below our constant range limit, trading needs OVERRIDE_TRADING_INTRADAY_RANGE.
+        in_range = (server_intraday_hour >= MIN_TRADING_INTRADAY_HOUR) and (server_intraday_hour <= MAX_TRADING_INTRADAY_HOUR)
+        if not (in_range or OVERRIDE_TRADING_INTRADAY_RANGE) or not hours.is_open(now):
+            return False
+        
+        ## Prevent NEW trades from being rolled over in the last hour of the session. This does not prevent active trades from accumulating fees.
+        if hours.is_rollover(now):
+            self.logger.info(f"Sorry I cannot allow trades to accumulate rollover fees. ¯\_(ツ)_/¯")
+            return False
+        
+        if VERBOSE:
+            if in_range:
+                self.logger.info(f"Trading {symbol} between hours {MIN_TRADING_INTRADAY_HOUR} and {MAX_TRADING_INTRADAY_HOUR}")
+            else:
+                self.logger.info(f"OVERRIDE_TRADING_INTRADAY_RANGE has been enabled for {symbol}. FBI will be at your door soon. ¯\_(ツ)_/¯")
+        return True
         
         
     
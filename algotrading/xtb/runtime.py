@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from algotrading.xtb.xapi import xapi
+from algotrading.xtb.xapi.bars import bar_starts
+from algotrading.xtb.xapi.enums import PeriodCode
+from algotrading.xtb.xapi.metrics import Histogram
+from algotrading.xtb.xapi.records import SymbolRecord
+from algotrading.constants import *
+
+"""
+
+Many symbols on one event loop.
+
+A MultiSymbolRuntime shares one (pooled) session and its demultiplexed stream between any number of symbols. The stream
+callbacks only append the tick dicts to a pending list, and every `interval` seconds the pending ticks of all symbols
+are processed together as arrays: quotes, the forming bar of `period` and the EMAs of the closed bars of every symbol
+live in one SymbolTable of NumPy columns with a row per symbol, so the cost per batch grows with the ticks received,
+not with the number of Python objects per symbol.
+
+    runtime = MultiSymbolRuntime(connector, ["EURUSD", "GBPJPY", "US500"])
+    await runtime.start()
+    runtime.table.row("GBPJPY")
+
+"""
+
+
+class SymbolTable:
+    """Per symbol state as columns, row `index[symbol]` of every column belongs to one symbol."""
+
+    def __init__(self, symbols: list, ema_periods: tuple = (EMA_M15_CHART_PERIOD1, EMA_M15_CHART_PERIOD2, EMA_M15_CHART_PERIOD3)):
+        self.symbols = list(symbols)
+        self.index = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.ema_periods = tuple(ema_periods)
+        self.records = [None] * len(self.symbols)       # Last SymbolRecord of every symbol
+
+        rows = len(self.symbols)
+        self.timestamp = np.zeros(rows, np.int64)       # Time of the last tick
+        self.bid = np.full(rows, np.nan)
+        self.ask = np.full(rows, np.nan)
+        self.ticks = np.zeros(rows, np.int64)           # Ticks received
+
+        self.bar_ctm = np.full(rows, -1, np.int64)      # Start time of the forming bar, -1 before the first tick
+        self.bar_open = np.full(rows, np.nan)
+        self.bar_high = np.full(rows, np.nan)
+        self.bar_low = np.full(rows, np.nan)
+        self.bar_close = np.full(rows, np.nan)
+        self.bars = np.zeros(rows, np.int64)            # Bars closed
+
+        self.ema = np.full((rows, len(self.ema_periods)), np.nan)
+        self._alpha = 2.0 / (np.asarray(self.ema_periods, dtype=np.float64) + 1.0)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def spread(self) -> np.ndarray:
+        return self.ask - self.bid
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays."""
+        return sum(value.nbytes for value in vars(self).values() if isinstance(value, np.ndarray))
+
+    def row(self, symbol: str) -> dict:
+        """Returns the state of one symbol as a dict."""
+
+        row = self.index[symbol]
+        return {
+            "symbol": symbol, "timestamp": int(self.timestamp[row]), "bid": self.bid[row], "ask": self.ask[row],
+            "ticks": int(self.ticks[row]), "bar": (int(self.bar_ctm[row]), self.bar_open[row], self.bar_high[row],
+            self.bar_low[row], self.bar_close[row]), "bars": int(self.bars[row]),
+            "ema": dict(zip(self.ema_periods, self.ema[row])), "record": self.records[row],
+        }
+
+    def close_bars(self, rows: np.ndarray):
+        """Closes the forming bars of `rows` (distinct) and feeds their closes into the EMAs."""
+
+        close = self.bar_close[rows][:, None]
+        ema = self.ema[rows]
+        self.ema[rows] = np.where(np.isnan(ema), close, ema + self._alpha * (close - ema))
+        self.bars[rows] += 1
+
+    def update(self, rows: np.ndarray, timestamps: np.ndarray, bids: np.ndarray, asks: np.ndarray, period: PeriodCode):
+        """Applies a batch of ticks (in arrival order) to the quotes and bars of their rows."""
+
+        # Quotes: the last tick of every row wins.
+        self.ticks += np.bincount(rows, minlength=len(self))
+        reverse = rows[::-1]
+        touched, last = np.unique(reverse, return_index=True)
+        last = len(rows) - 1 - last
+        self.timestamp[touched] = timestamps[last]
+        self.bid[touched] = bids[last]
+        self.ask[touched] = asks[last]
+
+        # Bars: group the ticks by (row, bar start), in bar order within each row. Bars start like chart candles, on the
+        # epoch below D1 and at midnight CET / CEST from D1 up.
+        starts = bar_starts(timestamps, period)
+        order = np.lexsort((np.arange(len(rows)), starts, rows))
+        rows, starts, bids = rows[order], starts[order], bids[order]
+        boundaries = np.flatnonzero((np.diff(rows) != 0) | (np.diff(starts) != 0)) + 1
+        first = np.concatenate(([0], boundaries))
+        last = np.concatenate((boundaries, [len(rows)])) - 1
+        group_rows, group_starts = rows[first], starts[first]
+        group_open, group_close = bids[first], bids[last]
+        group_high = np.maximum.reduceat(bids, first)
+        group_low = np.minimum.reduceat(bids, first)
+
+        # Every group is either the forming bar of its row, or starts a new bar after closing the forming one. A row
+        # with several new bars in one batch is handled round by round, rounds are almost always a single one.
+        remaining = np.ones(len(first), bool)
+        while remaining.any():
+            index = np.flatnonzero(remaining)
+            _, firsts = np.unique(group_rows[index], return_index=True)
+            index = index[firsts]
+            remaining[index] = False
+            rows, starts = group_rows[index], group_starts[index]
+
+            same = starts == self.bar_ctm[rows]
+            new = ~same & (starts > self.bar_ctm[rows])
+
+            update = rows[same]
+            self.bar_high[update] = np.maximum(self.bar_high[update], group_high[index][same])
+            self.bar_low[update] = np.minimum(self.bar_low[update], group_low[index][same])
+            self.bar_close[update] = group_close[index][same]
+
+            replace = rows[new]
+            closing = replace[self.bar_ctm[replace] != -1]
+            if len(closing):
+                self.close_bars(closing)
+            self.bar_ctm[replace] = starts[new]
+            self.bar_open[replace] = group_open[index][new]
+            self.bar_high[replace] = group_high[index][new]
+            self.bar_low[replace] = group_low[index][new]
+            self.bar_close[replace] = group_close[index][new]
+
+
+class MultiSymbolRuntime:
+    """
+    Parameters
+    ----------
+    `connector` : `XAPI` or `XAPIPool`
+        The logged in session shared by all symbols
+    `symbols` : `list`
+        The symbols to watch
+    `period` : `PeriodCode`, `optional`
+        The bar period of the table (default is `TRADE_PERIOD`)
+    `interval` : `float`, `optional`
+        Seconds between batches (default is `0.05`)
+    """
+
+    def __init__(self, connector: xapi.XAPI, symbols: list, period: PeriodCode = TRADE_PERIOD, interval: float = 0.05,
+                 ema_periods: tuple = (EMA_M15_CHART_PERIOD1, EMA_M15_CHART_PERIOD2, EMA_M15_CHART_PERIOD3)):
+        self.connector = connector
+        self.period = PeriodCode(period)
+        self.interval = interval
+        self.table = SymbolTable(symbols, ema_periods)
+        self.logger = logging.getLogger(__class__.__name__)
+
+        self.batches = 0
+        self.batch_size = Histogram(lowest=1.0, highest=1e7)
+        self.batch_time = Histogram()
+        self._pending = []
+        self._task = None
+
+    async def start(self):
+        """Loads the SymbolRecords, subscribes the ticks of every symbol and starts processing batches."""
+
+        await self.refresh_symbols()
+        for symbol in self.table.symbols:
+            await self.connector.stream.getTickPrices(symbol, callback=self._pending.append)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for symbol in self.table.symbols:
+            await self.connector.stream.stopTickPrices(symbol)
+
+    async def refresh_symbols(self):
+        """Updates the SymbolRecord of every symbol with one getAllSymbols request."""
+
+        response = await self.connector.socket.getAllSymbols()
+        for data in response.get("returnData") or []:
+            row = self.table.index.get(data.get("symbol"))
+            if row is not None:
+                self.table.records[row] = SymbolRecord.from_dict(data)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.process()
+            except Exception:
+                self.logger.exception("Tick batch failed")
+
+    def process(self):
+        """Applies every pending tick to the table."""
+
+        if not self._pending:
+            return
+        # The stream callbacks hold the bound `append` of this list, so it is emptied instead of replaced.
+        ticks = self._pending.copy()
+        self._pending.clear()
+
+        start = time.perf_counter()
+        index = self.table.index
+        count = len(ticks)
+        rows = np.fromiter((index.get(tick["symbol"], -1) for tick in ticks), np.int64, count)
+        timestamps = np.fromiter((tick["timestamp"] for tick in ticks), np.int64, count)
+        bids = np.fromiter((tick["bid"] for tick in ticks), np.float64, count)
+        asks = np.fromiter((tick["ask"] for tick in ticks), np.float64, count)
+
+        # Market depth levels are not part of the quotes.
+        known = (rows >= 0) & np.fromiter((tick.get("level", 0) == 0 for tick in ticks), bool, count)
+        if not known.all():
+            rows, timestamps, bids, asks = rows[known], timestamps[known], bids[known], asks[known]
+
+        if len(rows):
+            self.table.update(rows, timestamps, bids, asks, self.period)
+
+        self.batches += 1
+        self.batch_size.record(count)
+        self.batch_time.record(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self.table),
+            "batches": self.batches,
+            "ticks": int(self.table.ticks.sum()),
+            "batch_size": self.batch_size.snapshot(),
+            "batch_time": self.batch_time.snapshot(),
+            "table_bytes": self.table.nbytes,
+        }
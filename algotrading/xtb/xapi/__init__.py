@@ -6,9 +6,15 @@
 name = "xapi"
 __version__ = "0.1.7"
 
-from .xapi import XAPI, connect
-from .enums import TradeCmd, TradeType, TradeStatus, PeriodCode
+from .xapi import XAPI, XAPIPool, SocketPool, ReconnectRecord, connect
+from .enums import TradeCmd, TradeType, TradeStatus, PeriodCode, RequestPriority
 from .connection import Connection
+from .ratelimit import RateLimiter
+from .codec import Codec, get_codec
+from .heartbeat import Heartbeat, ConnectionHealth
+from .clock import ServerClock
+from .metrics import ConnectionMetrics, Histogram
+from .capture import FrameRecorder, replay
 from .socket import Socket
 from .stream import Stream
 from .exceptions import ConnectionClosed, LoginFailed
\ No newline at end of file
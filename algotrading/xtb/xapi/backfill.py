@@ -0,0 +1,147 @@
+from .enums import PeriodCode, TimeInt
+from .columnar import ChartColumns, concatenate, decode_chart_columns
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+"""
+
+Chunked, concurrent download of chart history over getChartRangeRequest.
+
+The server only keeps each period for a limited time back from now (PERIOD_M1 about one month, PERIOD_M30 about six
+months, PERIOD_H4 up to 13 months, PERIOD_D1 and coarser without limit) and silently returns less data when a request
+reaches further back. `plan()` splits a date range at those availability boundaries, falling back to the finest period
+still available for the older parts, and cuts every part into chunks of at most `chunk_candles` candles. `backfill()`
+fetches the chunks concurrently (the rate limiter and, with a pool, the least busy session decide the actual pace),
+then stitches and deduplicates them by ctm into one ChartColumns.
+
+    result = await backfill(connector.socket, "GBPJPY", start, end, PeriodCode.PERIOD_M15)
+    result.columns.close, result.periods
+
+"""
+
+# Months back from now that each period is guaranteed to be available for, None means no limit.
+AVAILABILITY = {
+    PeriodCode.PERIOD_M1: 1,
+    PeriodCode.PERIOD_M5: 1,
+    PeriodCode.PERIOD_M15: 1,
+    PeriodCode.PERIOD_M30: 7,
+    PeriodCode.PERIOD_H1: 7,
+    PeriodCode.PERIOD_H4: 13,
+    PeriodCode.PERIOD_D1: None,
+    PeriodCode.PERIOD_W1: None,
+    PeriodCode.PERIOD_MN1: None,
+}
+
+DEFAULT_CHUNK_CANDLES = 5000
+DEFAULT_CONCURRENCY = 4
+
+
+@dataclass
+class Chunk:
+    period: PeriodCode
+    start: int                          # Inclusive start time in milliseconds
+    end: int                            # Exclusive end time in milliseconds
+
+
+@dataclass
+class BackfillResult:
+    columns: ChartColumns               # Stitched candles, sorted by ctm without duplicates
+    periods: np.ndarray                 # int32 PeriodCode of every candle, coarser where the requested period fell back
+    chunks: List[Chunk]                 # Requested chunks, newest first
+    failed: List[Chunk] = field(default_factory=list)   # Chunks whose request returned no data
+    elapsed: float = 0.0                # Seconds from the first request to the stitched result
+
+
+def available_since(period: PeriodCode, now: int) -> Optional[int]:
+    """Returns the oldest time in milliseconds that `period` is available from, None if unlimited."""
+
+    months = AVAILABILITY.get(period)
+    return None if months is None else now - months * TimeInt.MONTHS
+
+
+def plan(start: int, end: int, period: PeriodCode, now: int = None, chunk_candles: int = DEFAULT_CHUNK_CANDLES,
+         fallback: bool = True) -> List[Chunk]:
+    """
+    Splits [start, end) into chunks of at most `chunk_candles` candles, newest first.
+
+    Parts of the range older than the availability window of `period` use the finest coarser period that is still
+    available there, or are left out if `fallback` is False.
+    """
+
+    now = int(time.time() * 1000) if now is None else now
+    end = min(end, now)
+    periods = [code for code in PeriodCode if code >= period]
+    chunks = []
+
+    for code in periods:
+        if end <= start:
+            break
+
+        since = available_since(code, now)
+        lower = start if since is None else max(start, since)
+        if lower < end:
+            step = chunk_candles * code.value * 60000
+            chunk_end = end
+            while chunk_end > lower:
+                chunks.append(Chunk(code, max(lower, chunk_end - step), chunk_end))
+                chunk_end -= step
+            end = lower
+
+        if not fallback:
+            break
+
+    return chunks
+
+
+async def backfill(socket, symbol: str, start: int, end: int, period: PeriodCode, now: int = None,
+                   chunk_candles: int = DEFAULT_CHUNK_CANDLES, concurrency: int = DEFAULT_CONCURRENCY,
+                   fallback: bool = True, logger: logging.Logger = None) -> BackfillResult:
+    """
+    Downloads the candles of `symbol` between `start` and `end` (milliseconds) at `period`, falling back to coarser
+    periods where `period` is no longer available.
+
+    Parameters
+    ----------
+    `socket` : `Socket` or `SocketPool`
+        The connection to send getChartRangeRequest on
+    `concurrency` : `int`, `optional`
+        Maximum number of chunk requests in flight (default is `4`)
+    """
+
+    logger = logger or logging.getLogger("xapi.backfill")
+    chunks = plan(start, end, period, now, chunk_candles, fallback)
+    semaphore = asyncio.Semaphore(concurrency)
+    began = time.perf_counter()
+
+    async def fetch(chunk: Chunk) -> Optional[ChartColumns]:
+        async with semaphore:
+            # The server treats end as inclusive, the last millisecond keeps neighbouring chunks apart.
+            response = await socket.getChartRangeRequest(symbol, chunk.start, chunk.end - 1, chunk.period, 0)
+        data = response.get("returnData") if isinstance(response, dict) else None
+        if not data:
+            logger.warning(f"No {chunk.period.name} data for {symbol} between {chunk.start} and {chunk.end}: {response}")
+            return None
+        columns = decode_chart_columns(data)
+        # Candles that start before the chunk belong to the neighbouring chunk or a coarser period.
+        return columns.take((columns.ctm >= chunk.start) & (columns.ctm < chunk.end))
+
+    parts = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+
+    fetched = [(chunk, part) for chunk, part in zip(chunks, parts) if part is not None]
+    failed = [chunk for chunk, part in zip(chunks, parts) if part is None]
+
+    # Tag every candle with its period before stitching, finer chunks come first and win duplicated ctm.
+    periods = np.concatenate([np.full(len(part), chunk.period.value, np.int32) for chunk, part in fetched] or [np.empty(0, np.int32)])
+    columns = concatenate([part for _, part in fetched])
+    if len(columns):
+        ctm = np.concatenate([part.ctm for _, part in fetched])
+        _, first = np.unique(ctm, return_index=True)
+        periods = periods[first]
+
+    return BackfillResult(columns, periods, chunks, failed, time.perf_counter() - began)
@@ -0,0 +1,190 @@
+from .clock import CET
+from .enums import PeriodCode
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional
+import collections
+import datetime
+
+import numpy as np
+
+"""
+
+Bars of every period from streamed candles or ticks.
+
+The stream only delivers 1 minute candles (getCandles) and ticks (getTickPrices). A BarBuilder folds either into the
+forming bar of every requested PeriodCode at once, so no period is ever recomputed from history or polled with
+getChartLastRequest. Bars start where the chart candles of the same period start: intraday periods up to H4 at
+multiples of the period since the epoch, which a DST change can neither stretch nor cut, D1 at midnight, W1 on Monday
+and MN1 on the first of the month in CET / CEST. So H4 bars start at 00:00, 04:00, ... UTC (01:00, 05:00, ... CET and
+02:00, 06:00, ... CEST), and the H4 bar holding a DST change lasts four hours but covers three or five hours of wall
+time. Bars do not follow trading session boundaries, a session opening mid-bar only fills part of it.
+
+A streamed candle may be sent again with the same `ctm` while it forms, it then replaces its previous version instead
+of being added twice. Every update passes the forming Bar of each period to `callback` (unless `partial` is False),
+and a bar is passed once more with `closed` set when the first update of a later bar arrives.
+
+    builder = BarBuilder("GBPJPY", callback=on_bar)
+    await connector.stream.getCandles("GBPJPY", callback=builder.on_candle)
+
+"""
+
+
+@dataclass(slots=True)
+class Bar:
+    symbol: str
+    period: PeriodCode
+    ctm: int                # Bar start time in milliseconds
+    open: float
+    high: float
+    low: float
+    close: float
+    vol: float = 0.0        # Volume in lots, 0 for bars built from ticks
+    closed: bool = False
+
+
+def bar_start(ctm: int, period: PeriodCode) -> int:
+    """
+    Returns the start time in milliseconds of the `period` bar holding the millisecond time `ctm`: a multiple of the
+    period since the epoch up to H4, midnight CET / CEST of the day, Monday or first of the month from D1.
+    """
+
+    # CET and CEST are whole hours from UTC, so periods below a day stay on the epoch grid through a DST change.
+    # Days, weeks and months start at midnight CET / CEST.
+    if period < PeriodCode.PERIOD_D1:
+        return ctm - ctm % (period * 60000)
+    local = datetime.datetime.fromtimestamp(ctm / 1000, CET).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == PeriodCode.PERIOD_W1:
+        local -= datetime.timedelta(days=local.weekday())
+    elif period == PeriodCode.PERIOD_MN1:
+        local = local.replace(day=1)
+    # Rebuilt from the wall time so the offset is the one in force at the bar start, not at `ctm`.
+    return int(datetime.datetime(local.year, local.month, local.day, tzinfo=CET).timestamp() * 1000)
+
+
+def bar_end(start: int, period: PeriodCode) -> int:
+    """Returns the start time of the bar after the `period` bar starting at `start`, a DST change shortens or lengthens days."""
+
+    if period < PeriodCode.PERIOD_D1:
+        return start + period * 60000
+    local = datetime.datetime.fromtimestamp(start / 1000, CET).replace(tzinfo=None)
+    if period == PeriodCode.PERIOD_MN1:
+        local = local.replace(year=local.year + local.month // 12, month=local.month % 12 + 1)
+    else:
+        local = local + datetime.timedelta(minutes=int(period))
+    return int(datetime.datetime(local.year, local.month, local.day, tzinfo=CET).timestamp() * 1000)
+
+
+def bar_starts(ctm: np.ndarray, period: PeriodCode) -> np.ndarray:
+    """Returns `bar_start` of every millisecond time of an int64 array."""
+
+    if period < PeriodCode.PERIOD_D1:
+        return ctm - ctm % (period * 60000)
+    # A batch spans few bars of a day or longer, so the rule runs once per distinct UTC hour.
+    hours, inverse = np.unique(ctm // 3600000, return_inverse=True)
+    starts = np.fromiter((bar_start(int(hour) * 3600000, period) for hour in hours), np.int64, len(hours))
+    return starts[inverse.reshape(-1)]
+
+
+class _FormingBar:
+    """The forming bar of one period: the candles folded so far and the newest candle, which may still be replaced."""
+
+    __slots__ = ("start", "end", "base", "last_ctm", "last")
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end              # Start of the next bar
+        self.base = None            # (open, high, low, close, vol) of the candles before the newest
+        self.last_ctm = None
+        self.last = None
+
+    def update(self, ctm: Optional[int], values: tuple):
+        if self.last is not None and (ctm is None or ctm != self.last_ctm):
+            self.base = self.last if self.base is None else _merge(self.base, self.last)
+        self.last_ctm, self.last = ctm, values
+
+    def values(self) -> tuple:
+        return self.last if self.base is None else _merge(self.base, self.last)
+
+
+def _merge(first: tuple, second: tuple) -> tuple:
+    return first[0], max(first[1], second[1]), min(first[2], second[2]), second[3], first[4] + second[4]
+
+
+class BarBuilder:
+    """
+    Parameters
+    ----------
+    `symbol` : `str`
+        The symbol of the candles or ticks fed to the builder
+    `periods` : `Iterable[PeriodCode]`, `optional`
+        The periods to build bars of (default is every PeriodCode)
+    `callback` : `Callable`, `optional`
+        Called with a Bar on every update of a forming bar and once more when it closes
+    `partial` : `bool`, `optional`
+        A parameter indicating whether updates of forming bars are passed to `callback`, or only closed bars (default is `True`)
+    `history` : `int`, `optional`
+        Number of closed bars kept per period in `closed` (default is `1000`)
+    """
+
+    def __init__(self, symbol: str, periods: Iterable[PeriodCode] = tuple(PeriodCode), callback: Callable[[Bar], None] = None,
+                 partial: bool = True, history: int = 1000):
+        self.symbol = symbol
+        self.periods = tuple(PeriodCode(period) for period in periods)
+        self.callback = callback
+        self.partial = partial
+        self.closed: Dict[PeriodCode, collections.deque] = {period: collections.deque(maxlen=history) for period in self.periods}
+        self._forming: Dict[PeriodCode, _FormingBar] = {}
+
+    def bar(self, period: PeriodCode) -> Optional[Bar]:
+        """Returns the forming bar of `period`, None before the first update."""
+
+        forming = self._forming.get(period)
+        return None if forming is None else Bar(self.symbol, period, forming.start, *forming.values())
+
+    def on_candle(self, candle):
+        """Stream callback of getCandles, folds a 1 minute candle (data dict or StreamingCandleRecord) into every period."""
+
+        if isinstance(candle, dict):
+            self.update(candle["ctm"], candle["open"], candle["high"], candle["low"], candle["close"], candle.get("vol") or 0.0)
+        else:
+            self.update(candle.ctm, candle.open, candle.high, candle.low, candle.close, candle.vol or 0.0)
+
+    def on_tick(self, tick):
+        """Stream callback of getTickPrices, folds the bid of a tick (data dict or StreamTickRecord) into every period."""
+
+        if isinstance(tick, dict):
+            if tick.get("level", 0) == 0:
+                self.update(tick["timestamp"], tick["bid"], tick["bid"], tick["bid"], tick["bid"], replace=False)
+        elif tick.level == 0:
+            self.update(tick.timestamp, tick.bid, tick.bid, tick.bid, tick.bid, replace=False)
+
+    def update(self, ctm: int, open: float, high: float, low: float, close: float, vol: float = 0.0, replace: bool = True):
+        """
+        Folds a candle starting at `ctm` into the forming bar of every period. With `replace` a candle with the same
+        `ctm` as the previous one replaces it (a forming 1 minute candle sent again), otherwise it is added (a tick).
+        Updates older than the forming bar of a period are ignored for that period.
+        """
+
+        values = (open, high, low, close, vol)
+        key = ctm if replace else None
+        for period in self.periods:
+            forming = self._forming.get(period)
+            if forming is None or ctm >= forming.end:
+                if forming is not None:
+                    self._emit(period, forming, closed=True)
+                start = bar_start(ctm, period)
+                forming = self._forming[period] = _FormingBar(start, bar_end(start, period))
+            elif ctm < forming.start:
+                continue
+            forming.update(key, values)
+            if self.partial and self.callback is not None:
+                self._emit(period, forming, closed=False)
+
+    def _emit(self, period: PeriodCode, forming: _FormingBar, closed: bool):
+        bar = Bar(self.symbol, period, forming.start, *forming.values(), closed=closed)
+        if closed:
+            self.closed[period].append(bar)
+        if self.callback is not None:
+            self.callback(bar)
+
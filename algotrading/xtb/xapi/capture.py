@@ -0,0 +1,168 @@
+from .xapi import XAPI
+from .ratelimit import RateLimiter
+from .exceptions import ConnectionClosed
+
+from typing import Iterator, Tuple
+import collections
+import asyncio
+import struct
+import json
+import time
+import os
+
+"""
+
+Capture and replay of raw websocket frames.
+
+A capture file starts with the 8 byte magic b"XAPICAP1" followed by append-only records of
+    <float64 receive time.time()> <uint8 channel> <uint32 length> <frame bytes>
+where channel 0 is the socket connection and channel 1 the stream connection (`Socket.channel`, `Stream.channel`).
+
+`replay()` returns an XAPI whose connections read a capture instead of a websocket, so the dispatcher, subscriptions,
+strategies and indicators run unchanged against recorded market bursts. Stream frames are paced by their recorded
+receive times divided by `speed` (`None` replays as fast as possible); socket responses are returned in recorded
+order, each one only after a command was sent and tagged with that command's 'customTag', so multiplexed sessions
+replay too.
+
+"""
+
+MAGIC = b"XAPICAP1"
+SOCKET, STREAM = 0, 1
+
+_HEADER = struct.Struct("<dBI")
+
+
+class FrameRecorder:
+    """Appends received frames to a capture file."""
+
+    def __init__(self, path: str, buffering: int = 1 << 20):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.path = path
+        self.frames = 0
+        self._file = open(path, "ab", buffering=buffering)
+        if new:
+            self._file.write(MAGIC)
+
+    def write(self, channel: int, frame):
+        if isinstance(frame, str):
+            frame = frame.encode()
+        self._file.write(_HEADER.pack(time.time(), channel, len(frame)))
+        self._file.write(frame)
+        self.frames += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def read_frames(path: str) -> Iterator[Tuple[float, int, bytes]]:
+    """Yields (receive time, channel, frame) records of a capture file."""
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an xapi capture file")
+
+        while True:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            received, channel, length = _HEADER.unpack(header)
+            frame = file.read(length)
+            if len(frame) < length:
+                return
+            yield received, channel, frame
+
+
+class ReplayClock:
+    """Maps recorded receive times onto the event loop clock at `speed` times real time."""
+
+    def __init__(self, origin: float, speed: float = 1.0):
+        self.origin = origin
+        self.speed = speed
+        self.start = None
+
+    async def wait(self, received: float):
+        if not self.speed:
+            return
+        if self.start is None:
+            self.start = time.monotonic()
+        delay = (received - self.origin) / self.speed - (time.monotonic() - self.start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ReplayWebSocket:
+    """
+    Stands in for a websocket connection, returning the recorded frames of one channel. With `responses` every frame
+    answers a command: it is returned only once a command was sent, carrying the 'customTag' of that command.
+    """
+
+    def __init__(self, frames: list, clock: ReplayClock = None, responses: bool = False):
+        self._frames = collections.deque(frames)
+        self._clock = clock
+        self._commands = asyncio.Queue() if responses else None     # 'customTag' of every sent command not yet answered
+        self.sent = 0
+
+    async def send(self, message):
+        self.sent += 1
+        if self._commands is not None:
+            self._commands.put_nowait(json.loads(message).get("customTag"))
+
+    async def recv(self):
+        tag = None
+        if self._commands is not None and self._frames:
+            tag = await self._commands.get()
+        if not self._frames:
+            raise ConnectionClosed("End of capture")
+        received, frame = self._frames.popleft()
+        if self._clock is not None:
+            await self._clock.wait(received)
+        if tag is not None:
+            # The recorded tag (if any) belongs to the recorded session, the replayed command may carry another one.
+            frame = json.dumps({**json.loads(frame), "customTag": tag})
+        return frame
+
+    async def close(self):
+        self._frames.clear()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._frames:
+            raise StopAsyncIteration
+        return await self.recv()
+
+
+async def replay(path: str, speed: float = 1.0, **kwargs) -> XAPI:
+    """
+    Returns an XAPI session fed from a capture file, keyword arguments are passed to `XAPI`.
+
+    Parameters
+    ----------
+    `path` : `str`
+        The capture file written by `XAPI.start_capture`
+    `speed` : `float`, `optional`
+        Replay speed relative to the recorded receive times, `None` or `0` for maximum speed (default is `1.0`)
+    """
+
+    frames = {SOCKET: [], STREAM: []}
+    origin = None
+    for received, channel, frame in read_frames(path):
+        origin = received if origin is None else origin
+        frames[channel].append((received, frame))
+
+    # A replay does not talk to the broker, so commands are not rate limited unless a limiter is given.
+    kwargs.setdefault("limiter", RateLimiter(rate=1e9, burst=1 << 30))
+
+    x = XAPI(**kwargs)
+    x.socket._conn = ReplayWebSocket(frames[SOCKET], responses=True)
+    x.stream._conn = ReplayWebSocket(frames[STREAM], ReplayClock(origin or 0.0, speed))
+    if x.socket.multiplexed:
+        x.socket._reader = asyncio.create_task(x.socket._read_responses())
+
+    # A replay has nothing to reconnect to.
+    x.closed = True
+    return x
@@ -0,0 +1,156 @@
+from .enums import TradeDay
+from .exceptions import ConnectionClosed
+from .metrics import Histogram
+
+import asyncio
+import collections
+import datetime
+import logging
+import time
+import zoneinfo
+
+"""
+
+Server clock synchronisation.
+
+Instead of sending getServerTime whenever the broker's time is needed, a ServerClock samples it every `interval`
+seconds and estimates the server time from the local monotonic clock, the way NTP does: a sample sent at t0 and
+answered at t1 with server time T gives the offset T - (t0 + t1) / 2, which is wrong by at most half the round trip.
+Of the recent samples the one with the shortest round trip gives the offset, and a least squares fit of the offsets
+over time gives the drift of the local clock against the server. `server_now()` is then arithmetic and never goes
+backwards, and the error bound of every sample (half its round trip) is kept as a histogram.
+
+    clock = await connector.start_clock()
+    clock.server_now()          # Milliseconds since the epoch on the server
+    clock.server_datetime()     # The same time in CET / CEST, the time zone of candles and trading hours
+
+"""
+
+CET = zoneinfo.ZoneInfo("Europe/Berlin")
+MAX_DRIFT = 500e-6                  # Largest drift estimate, 500 ppm
+DRIFT_SPAN = 60000                  # Milliseconds the samples must span before drift is estimated
+
+
+def _monotonic_ms() -> float:
+    # The clock of the send and receive times recorded by Connection._transaction.
+    return time.perf_counter() * 1000
+
+
+class ServerClock:
+    """
+    Parameters
+    ----------
+    `socket` : `Socket` or `SocketPool`
+        The connection to send getServerTime on
+    `interval` : `float`, `optional`
+        Seconds between samples (default is `60.0`)
+    `samples` : `int`, `optional`
+        Number of recent samples the offset and drift are estimated from (default is `8`)
+    """
+
+    def __init__(self, socket, interval: float = 60.0, samples: int = 8):
+        self.socket = socket
+        self.interval = interval
+        self.samples = collections.deque(maxlen=samples)   # (local perf_counter ms at the midpoint, offset ms, round trip ms)
+        self.error = Histogram(lowest=1e-3, highest=1e5)    # Half round trip of every sample in milliseconds
+        self.logger = logging.getLogger(__class__.__name__)
+
+        # Until the first sample the local wall clock stands in for the server.
+        self.offset = time.time() * 1000 - _monotonic_ms()
+        self.drift = 0.0                # Server milliseconds gained per local millisecond
+        self.reference = _monotonic_ms()
+        self.synced = False
+        self.failures = 0
+        self._last = 0.0
+        self._task = None
+
+    async def start(self):
+        """Takes the first sample and keeps sampling every `interval` seconds."""
+
+        if self._task is not None and not self._task.done():
+            return
+        await self.sample()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sample()
+            except (ConnectionClosed, KeyError, TypeError) as e:
+                # An error response has no returnData, the next sample may succeed.
+                self.failures += 1
+                self.logger.info(f"Clock sample failed: {e!r}")
+
+    async def sample(self):
+        """Sends one getServerTime and updates the offset and drift estimates."""
+
+        # Timed from the actual send, a wait in the rate limiter queue would widen the round trip and bias the midpoint.
+        timing = []
+        response = await self.socket.getServerTime(timing=timing)
+        server_time = response["returnData"]["time"]
+        sent, received = timing[0] * 1000, timing[1] * 1000
+
+        midpoint = (sent + received) / 2
+        round_trip = received - sent
+        self.samples.append((midpoint, server_time - midpoint, round_trip))
+        self.error.record(max(round_trip / 2, 1e-3))
+        self._estimate()
+        self.synced = True
+
+    def _estimate(self):
+        # The offset of the sample with the shortest round trip is the least wrong one.
+        midpoint, offset, round_trip = min(self.samples, key=lambda sample: sample[2])
+
+        # Drift is the slope of the offsets over local time, fitted to the samples with a short round trip only, and
+        # bounded like NTP bounds its frequency correction. Samples a few seconds apart cannot tell drift from noise.
+        samples = [sample for sample in self.samples if sample[2] <= 2 * round_trip + 1.0]
+        drift = 0.0
+        if len(samples) > 2 and samples[-1][0] - samples[0][0] >= DRIFT_SPAN:
+            mean_x = sum(sample[0] for sample in samples) / len(samples)
+            mean_y = sum(sample[1] for sample in samples) / len(samples)
+            variance = sum((sample[0] - mean_x) ** 2 for sample in samples)
+            if variance > 0:
+                drift = sum((sample[0] - mean_x) * (sample[1] - mean_y) for sample in samples) / variance
+                drift = min(max(drift, -MAX_DRIFT), MAX_DRIFT)
+
+        self.reference, self.offset, self.drift = midpoint, offset, drift
+
+    def server_now(self) -> int:
+        """Returns the estimated server time in milliseconds since the epoch, never less than a previous result."""
+
+        local = _monotonic_ms()
+        now = local + self.offset + self.drift * (local - self.reference)
+        if now < self._last:
+            now = self._last
+        self._last = now
+        return int(now)
+
+    def server_datetime(self, now: int = None) -> datetime.datetime:
+        """Returns the server time (or the millisecond time `now`) as an aware datetime in CET / CEST."""
+
+        now = self.server_now() if now is None else now
+        return datetime.datetime.fromtimestamp(now / 1000, CET)
+
+    def trade_day(self, now: int = None) -> TradeDay:
+        """Returns the day of week of the server time in CET / CEST."""
+        return TradeDay(self.server_datetime(now).isoweekday())
+
+    def snapshot(self) -> dict:
+        return {
+            "synced": self.synced,
+            "samples": len(self.samples),
+            "failures": self.failures,
+            "offset": self.offset,
+            "drift_ppm": self.drift * 1e6,
+            "error": self.error.snapshot(),
+        }
@@ -0,0 +1,134 @@
+from .records import ChartRecord, RateInfoRecord
+
+from dataclasses import dataclass
+from typing import Optional
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+"""
+
+JSON codecs used by Connection to encode commands and decode responses and stream messages.
+
+The fastest installed backend is picked by default (msgspec, then orjson, then the standard library json module).
+Commands are always encoded to `str` because the xAPI only accepts text frames.
+
+With `typed_charts=True` the 'returnData' of getChartLastRequest and getChartRangeRequest responses is decoded into a
+`ChartRecord` holding `RateInfoRecord` objects instead of nested dicts.
+
+"""
+
+CHART_COMMANDS = ("getChartLastRequest", "getChartRangeRequest")
+
+
+class Codec:
+    """Standard library json codec, always available."""
+
+    name = "json"
+
+    def __init__(self, typed_charts: bool = False):
+        self.typed_charts = typed_charts
+
+    def encode(self, obj) -> str:
+        return json.dumps(obj)
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def decode(self, data, command: str = None):
+        """Decode a frame, converting chart data to typed records if enabled and `command` is a chart command."""
+        return self.convert(self.loads(data), command)
+
+    def convert(self, response, command: str = None):
+        """Convert an already decoded response to typed records if enabled and `command` is a chart command."""
+
+        if self.typed_charts and command in CHART_COMMANDS:
+            data = response.get('returnData')
+            if isinstance(data, dict):
+                response['returnData'] = ChartRecord(
+                    digits=data['digits'],
+                    rateInfos=[RateInfoRecord.from_dict(info) for info in data['rateInfos']]
+                )
+        return response
+
+
+class OrjsonCodec(Codec):
+    """orjson codec, roughly 3-5x faster than the standard library on large chart responses."""
+
+    name = "orjson"
+
+    def encode(self, obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgspecCodec(Codec):
+    """msgspec codec, which can also decode chart responses directly into typed records in a single pass."""
+
+    name = "msgspec"
+
+    def __init__(self, typed_charts: bool = False):
+        super().__init__(typed_charts)
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._chart_decoder = msgspec.json.Decoder(_ChartResponse)
+
+    def encode(self, obj) -> str:
+        return self._encoder.encode(obj).decode()
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+    def decode(self, data, command: str = None):
+        if self.typed_charts and command in CHART_COMMANDS:
+            try:
+                response = self._chart_decoder.decode(data)
+            except msgspec.ValidationError:
+                return self.loads(data)
+            return {key: value for key, value in response.__dict__.items() if value is not None}
+        return self.loads(data)
+
+
+@dataclass
+class _ChartResponse:
+    status: bool
+    returnData: Optional[ChartRecord] = None
+    customTag: Optional[str] = None
+    errorCode: Optional[str] = None
+    errorDescr: Optional[str] = None
+
+
+CODECS = {codec.name: codec for codec in (Codec, OrjsonCodec, MsgspecCodec)}
+
+def available_codecs() -> list:
+    """Returns the names of the codecs whose backend is installed, fastest first."""
+    backends = {"json": json, "orjson": orjson, "msgspec": msgspec}
+    return [name for name in ("msgspec", "orjson", "json") if backends[name] is not None]
+
+def get_codec(name: str = None, typed_charts: bool = False) -> Codec:
+    """
+    Returns a codec instance by backend name, or the fastest installed one if `name` is None.
+
+    Raises
+    ------
+    `ValueError`
+        Raised when the named backend is unknown or not installed.
+    """
+
+    if name is None:
+        name = available_codecs()[0]
+
+    if name not in available_codecs():
+        raise ValueError(f"JSON codec '{name}' is not available, choose from {available_codecs()}")
+
+    return CODECS[name](typed_charts=typed_charts)
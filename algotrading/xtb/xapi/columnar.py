@@ -0,0 +1,153 @@
+from .records import ChartRecord
+
+from dataclasses import dataclass
+from operator import attrgetter, itemgetter
+from typing import List
+import datetime
+
+import numpy as np
+import pandas as pd
+
+"""
+
+Columnar decoding of chart responses.
+
+getChartLastRequest and getChartRangeRequest return {"digits": 5, "rateInfos": [RATE_INFO_RECORD, ...]}, where open is
+the price in base currency * 10 ** digits and high, low and close are shifts from open. Instead of one RateInfoRecord
+per candle, the candles are decoded in one pass into contiguous NumPy columns:
+
+    ctm                 int64      Candle start time in milliseconds
+    open/high/low/close int64      Absolute fixed-point prices (price * 10 ** digits)
+    vol                 float64    Volume in lots
+
+"""
+
+_FIELDS = itemgetter("ctm", "open", "high", "low", "close", "vol")
+_ATTRS = attrgetter("ctm", "open", "high", "low", "close", "vol")
+_COLUMNS = ("ctm", "open", "high", "low", "close", "vol")
+
+# Version of the frames built by to_ohlcv_frame, part of the FrameCache key. Bump it when their content changes.
+FRAME_VERSION = 1
+
+
+@dataclass
+class ChartColumns:
+    digits: int             # Number of decimal places of the fixed-point prices
+    ctm: np.ndarray         # int64 candle start times in milliseconds
+    open: np.ndarray        # int64 open prices * 10 ** digits
+    high: np.ndarray        # int64 high prices * 10 ** digits
+    low: np.ndarray         # int64 low prices * 10 ** digits
+    close: np.ndarray       # int64 close prices * 10 ** digits
+    vol: np.ndarray         # float64 volumes in lots
+
+    def __len__(self) -> int:
+        return len(self.ctm)
+
+    @property
+    def scale(self) -> int:
+        return 10 ** self.digits
+
+    def take(self, index) -> "ChartColumns":
+        """Returns the candles selected by a slice, boolean mask or index array."""
+        return ChartColumns(self.digits, *(getattr(self, column)[index] for column in _COLUMNS))
+
+    def prices(self, column: str) -> np.ndarray:
+        """Returns a price column as float64 in base currency."""
+        return getattr(self, column) / self.scale
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns a DataFrame of ctm, float open/high/low/close prices and vol."""
+
+        return pd.DataFrame({
+            "ctm": self.ctm,
+            "open": self.prices("open"),
+            "high": self.prices("high"),
+            "low": self.prices("low"),
+            "close": self.prices("close"),
+            "vol": self.vol,
+        })
+
+    def to_ohlcv_frame(self, points: bool = False) -> pd.DataFrame:
+        """
+        Returns the backtest frame: a Date index and Time column of the candle start in CET / CEST, and Open, High, Low,
+        Close prices in base currency (int64 points of 10 ** -digits if `points`) and Volume. Built from the integer ctm
+        and digits without parsing any strings.
+        """
+
+        price = (lambda column: np.asarray(getattr(self, column))) if points else self.prices
+        local = pd.to_datetime(self.ctm, unit="ms", utc=True).tz_convert("Europe/Berlin").tz_localize(None)
+        df = pd.DataFrame({
+            "Time": _times_of_day(local),
+            "Open": price("open"),
+            "High": price("high"),
+            "Low": price("low"),
+            "Close": price("close"),
+            "Volume": np.asarray(self.vol),
+        }, index=local.normalize().rename("Date"))
+        df.attrs["digits"] = self.digits
+        return df
+
+    def to_ohlcv_points_frame(self) -> pd.DataFrame:
+        """Returns the backtest frame with Open, High, Low and Close in int64 points, see `to_ohlcv_frame`."""
+        return self.to_ohlcv_frame(points=True)
+
+    def to_rate_info_frame(self) -> pd.DataFrame:
+        """Returns a DataFrame in the RateInfoRecord layout (ctmString, ctm, open, shift encoded high/low/close, vol)."""
+
+        ctm_string = pd.to_datetime(self.ctm, unit="ms", utc=True).tz_convert("Europe/Berlin").strftime("%b %d, %Y, %I:%M:%S %p")
+        return pd.DataFrame({
+            "ctmString": ctm_string,
+            "ctm": self.ctm,
+            "open": self.open,
+            "high": self.high - self.open,
+            "low": self.low - self.open,
+            "close": self.close - self.open,
+            "vol": self.vol,
+        })
+
+
+def _times_of_day(local: pd.DatetimeIndex) -> np.ndarray:
+    """Returns the datetime.time of every timestamp, creating one object per distinct time of day instead of per row."""
+
+    seconds = ((local - local.normalize()) // pd.Timedelta(seconds=1)).to_numpy()
+    distinct, inverse = np.unique(seconds, return_inverse=True)
+    times = np.empty(len(distinct), dtype=object)
+    times[:] = [datetime.time(second // 3600, second // 60 % 60, second % 60) for second in distinct.tolist()]
+    return times[inverse.ravel()]
+
+
+def decode_chart_columns(return_data) -> ChartColumns:
+    """Decodes the 'returnData' of a chart response (or a typed ChartRecord) into a ChartColumns without creating a record per candle."""
+
+    if isinstance(return_data, ChartRecord):
+        digits, rate_infos, fields = return_data.digits, return_data.rateInfos or [], _ATTRS
+    else:
+        digits, rate_infos, fields = return_data.get("digits", 0), return_data.get("rateInfos") or [], _FIELDS
+    table = np.array(list(map(fields, rate_infos)), dtype=np.float64).reshape(len(rate_infos), 6)
+
+    # Prices and times arrive as whole numbers, float64 holds them exactly up to 2 ** 53.
+    ctm = table[:, 0].astype(np.int64)
+    open = np.rint(table[:, 1]).astype(np.int64)
+    shifts = np.rint(table[:, 2:5]).astype(np.int64)
+
+    return ChartColumns(
+        digits=int(digits),
+        ctm=ctm,
+        open=open,
+        high=open + shifts[:, 0],
+        low=open + shifts[:, 1],
+        close=open + shifts[:, 2],
+        vol=np.ascontiguousarray(table[:, 5]),
+    )
+
+
+def concatenate(parts: List[ChartColumns], digits: int = 0) -> ChartColumns:
+    """Joins ChartColumns of one symbol, sorted by ctm and keeping the first candle of every duplicated ctm."""
+
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return ChartColumns(digits, *(np.empty(0, np.float64 if column == "vol" else np.int64) for column in _COLUMNS))
+
+    joined = ChartColumns(parts[0].digits, *(np.concatenate([getattr(part, column) for part in parts]) for column in _COLUMNS))
+    _, first = np.unique(joined.ctm, return_index=True)
+    return joined.take(first)
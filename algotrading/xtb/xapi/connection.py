@@ -1,22 +1,45 @@
-from .exceptions import ConnectionClosed
+from .exceptions import ConnectionClosed, CommandNotSent
+from .ratelimit import RateLimiter, command_priority
+from .codec import Codec, get_codec
+from .heartbeat import ConnectionHealth
+from .metrics import ConnectionMetrics
 
+from typing import Callable, Optional
 import websockets.client
 import websockets.exceptions
+import itertools
 import socket
 import asyncio
-import json
 import time
 
 class Connection():
-    def __init__(self):
+    # Channel number of this connection in frame captures.
+    channel = 0
+
+    def __init__(self, multiplexed: bool = False, limiter: RateLimiter = None, codec: Codec = None):
         self.safe = False
+        self.multiplexed = multiplexed
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.codec = codec if codec is not None else get_codec()
+        self.last_queue_wait = 0.0
+        self.last_request = time.monotonic()
+        self.health = ConnectionHealth()
+        self.metrics = ConnectionMetrics()
+        self.recorder = None
+        self.on_closed: Optional[Callable] = None   # Awaited with the error when a command finds the connection dropped,
+                                                    # returns whether the connection was restored
         self._conn = None
         self._lock = asyncio.Lock()
-        self._last_request_time = None
+        self._skip_delay = False
+
+        # Multiplexed mode: responses are matched to requests by 'customTag'.
+        self._tags = itertools.count(1)
+        self._pending = {}
+        self._reader = None
 
     def skip_delay(self):
-        """Dispatch the next request without the 200ms delay"""
-        self._last_request_time = None
+        """Dispatch the next request without waiting for the rate limiter"""
+        self._skip_delay = True
 
     async def connect(self, url):
         try:
@@ -34,7 +57,15 @@ class Connection():
         except ConnectionRefusedError:
             raise ConnectionClosed("Connection refused")
 
+        self.last_request = time.monotonic()
+        if self.multiplexed:
+            self._reader = asyncio.create_task(self._read_responses())
+
     async def disconnect(self):
+        if self._reader:
+            self._reader.cancel()
+            self._reader = None
+
         try:
             if self._conn:
                 await self._conn.close()
@@ -43,12 +74,20 @@ class Connection():
             pass
 
         self._conn = None
+        self._fail_pending(ConnectionClosed("Connection closed"))
 
     async def listen(self):
         try:
             if self._conn:
                 async for message in self._conn:
-                    yield json.loads(message)
+                    received = time.perf_counter()
+                    if self.recorder is not None:
+                        self.recorder.write(self.channel, message)
+                    data = self.codec.decode(message)
+                    metrics = self.metrics[data.get("command") if isinstance(data, dict) else None]
+                    metrics.decode.record(time.perf_counter() - received)
+                    metrics.bytes.record(len(message))
+                    yield data
             else:
                 raise ConnectionClosed("Not connected")
 
@@ -57,32 +96,136 @@ class Connection():
             raise ConnectionClosed(f"WebSocket exception: {e}")
 
     async def _request(self, command):
-        if self._last_request_time is not None:
-            elapsed_time = time.time() - self._last_request_time
-            if elapsed_time < 0.2:
-                await asyncio.sleep(0.2 - elapsed_time)
+        """Sends a command once the rate limiter allows it and returns the `time.perf_counter()` at which the send completed."""
+
+        metrics = self.metrics[command.get("command")]
+        if self._skip_delay:
+            self._skip_delay = False
+            self.last_queue_wait = 0.0
+        else:
+            self.last_queue_wait = await self.limiter.acquire(command_priority(command.get("command")))
+        metrics.queue_wait.record(self.last_queue_wait)
 
         try:
             if self._conn:
-                await self._conn.send(json.dumps(command))
-                self._last_request_time = time.time()
+                start = time.perf_counter()
+                await self._conn.send(self.codec.encode(command))
+                sent = time.perf_counter()
+                self.last_request = time.monotonic()
+                metrics.send.record(sent - start)
+                return sent
             else:
-                raise ConnectionClosed("Not connected")
+                raise CommandNotSent("Not connected")
 
         except websockets.exceptions.WebSocketException as e:
             self._conn = None
-            raise ConnectionClosed(f"WebSocket exception: {e}")
+            metrics.errors += 1
+            raise CommandNotSent(f"WebSocket exception: {e}")
+
+    async def _transaction(self, command, timing: list = None):
+        """
+        Sends a command and returns its response. A `timing` list receives the `time.perf_counter()` (sent, received)
+        pair of the command, measured from the actual send so time queued in the rate limiter is not included.
+
+        When the connection turned out to be dropped, `on_closed` may restore it. A command that never reached the
+        server is then sent again, a command whose response was lost still raises as it may have been executed.
+        """
+
+        try:
+            return await self._exchange(command, timing)
+        except ConnectionClosed as error:
+            if self.on_closed is None or not await self.on_closed(error) or not isinstance(error, CommandNotSent):
+                raise
+            return await self._exchange(command, timing)
+
+    async def _exchange(self, command, timing: list = None):
+        if self.multiplexed:
+            return await self._tagged_transaction(command, timing)
 
-    async def _transaction(self, command):
         async with self._lock:
             try:
                 if self._conn:
-                    await self._request(command)
+                    sent = await self._request(command)
                     response = await self._conn.recv()
-                    return json.loads(response)
+                    received = time.perf_counter()
+                    if self.recorder is not None:
+                        self.recorder.write(self.channel, response)
+                    result = self.codec.decode(response, command.get("command"))
+                    self._record_response(command.get("command"), result, response, sent, received)
+                    if timing is not None:
+                        timing[:] = (sent, received)
+                    return result
                 else:
-                    raise ConnectionClosed("Not connected")
+                    raise CommandNotSent("Not connected")
 
             except websockets.exceptions.WebSocketException as e:
                 self._conn = None
-                raise ConnectionClosed(f"WebSocket exception: {e}")
\ No newline at end of file
+                self.metrics[command.get("command")].errors += 1
+                raise ConnectionClosed(f"WebSocket exception: {e}")
+
+    async def _tagged_transaction(self, command, timing: list = None):
+        """
+        Send a command tagged with a unique 'customTag' and wait for the reader task to resolve its response.
+        Any number of tagged transactions may be in flight at once.
+        """
+
+        if not self._conn or self._reader is None or self._reader.done():
+            raise CommandNotSent("Not connected")
+
+        tag = str(next(self._tags))
+        future = asyncio.get_running_loop().create_future()
+        pending = [future, command.get("command"), None, None]
+        self._pending[tag] = pending
+
+        try:
+            pending[2] = await self._request({**command, "customTag": tag})
+            response = await future
+            if timing is not None:
+                timing[:] = pending[2:]
+            return response
+        finally:
+            self._pending.pop(tag, None)
+
+    async def _read_responses(self):
+        """Background reader for multiplexed mode, routes every response to the future waiting on its 'customTag'."""
+
+        try:
+            async for message in self._conn:
+                received = time.perf_counter()
+                if self.recorder is not None:
+                    self.recorder.write(self.channel, message)
+                response = self.codec.loads(message)
+                if "customTag" in response:
+                    # An unknown tag is the late reply of a request that timed out or was cancelled, it is dropped.
+                    pending = self._pending.get(response["customTag"])
+                else:
+                    # A response without a tag (e.g. some error responses) goes to the oldest request in flight.
+                    pending = next((p for p in self._pending.values() if not p[0].done()), None)
+
+                if pending is not None and not pending[0].done():
+                    future, command, sent, _ = pending
+                    pending[3] = received
+                    response = self.codec.convert(response, command)
+                    self._record_response(command, response, message, sent, received)
+                    future.set_result(response)
+
+            self._fail_pending(ConnectionClosed("Connection closed"))
+
+        except websockets.exceptions.WebSocketException as e:
+            self._conn = None
+            self._fail_pending(ConnectionClosed(f"WebSocket exception: {e}"))
+
+    def _record_response(self, command, response, message, sent, received):
+        metrics = self.metrics[command]
+        if sent is not None:
+            metrics.round_trip.record(received - sent)
+        metrics.decode.record(time.perf_counter() - received)
+        metrics.bytes.record(len(message))
+        if isinstance(response, dict) and response.get("status") is False:
+            metrics.errors += 1
+
+    def _fail_pending(self, exception):
+        for future, *_ in self._pending.values():
+            if not future.done():
+                future.set_exception(exception)
+        self._pending.clear()
@@ -0,0 +1,261 @@
+from .exceptions import ConnectionClosed
+from .records import StreamTickRecord
+
+from typing import Callable, Optional
+import collections
+import asyncio
+import logging
+import time
+
+"""
+
+Topic demultiplexing of stream messages.
+
+Every message of the stream connection looks like {"command": "tickPrices", "data": {...}}. The dispatcher reads the
+stream once and routes each message by its command and symbol to the subscriptions of that topic, so a consumer of
+GBPJPY ticks never sees candles or balance updates and a slow consumer only fills its own queue.
+
+Queues are bounded and drop their oldest message when full, the newest market data is always the most useful.
+Subscriptions of a command without a symbol (e.g. ("trade", None)) receive the messages of every symbol.
+
+Tick subscriptions can instead conflate: only the newest quote per symbol and price level is kept, so a consumer that is
+slower than the tick rate always wakes up to the current price instead of working through a backlog of stale ones.
+
+"""
+
+DEFAULT_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """
+    A bounded queue of the `data` payloads of one stream topic, consumed with `async for`.
+    When a `callback` is given it is called for every payload from the dispatcher task instead of queueing it,
+    so it must be quick and non-blocking.
+    """
+
+    def __init__(self, dispatcher: "StreamDispatcher", command: str, symbol: Optional[str] = None,
+                 maxsize: int = DEFAULT_QUEUE_SIZE, callback: Optional[Callable] = None):
+        self.command = command
+        self.symbol = symbol
+        self.maxsize = maxsize
+        self.callback = callback
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+        self._dispatcher = dispatcher
+        self._queue = collections.deque()
+        self._ready = asyncio.Event()
+        self._error = None
+
+    @property
+    def topic(self) -> tuple:
+        return (self.command, self.symbol)
+
+    @property
+    def depth(self) -> int:
+        """Number of payloads waiting to be consumed."""
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        return {"depth": self.depth, "delivered": self.delivered, "dropped": self.dropped}
+
+    def put(self, data):
+        if self.callback is not None:
+            self.delivered += 1
+            self.callback(data)
+            return
+
+        if len(self._queue) >= self.maxsize:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(data)
+        self._ready.set()
+
+    def close(self, error: Exception = None):
+        """Stops the subscription, pending payloads are still delivered before iteration ends or `error` is raised."""
+        self.closed = True
+        self._error = error
+        self._ready.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._dispatcher.start()
+
+        while not self._queue:
+            if self.closed:
+                if self._error is not None:
+                    raise self._error
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+
+        self.delivered += 1
+        return self._queue.popleft()
+
+
+class ConflatingSubscription(Subscription):
+    """
+    A tick subscription that keeps only the newest quote per (symbol, level) and yields it as a `StreamTickRecord`.
+    `coalesced` counts the updates that were replaced by a newer one before being consumed.
+    """
+
+    def __init__(self, dispatcher: "StreamDispatcher", command: str, symbol: Optional[str] = None,
+                 callback: Optional[Callable] = None):
+        super().__init__(dispatcher, command, symbol, callback=callback)
+        self.coalesced = 0
+        self._latest = {}
+
+    @property
+    def depth(self) -> int:
+        return len(self._latest)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "coalesced": self.coalesced}
+
+    def put(self, data):
+        if self.callback is not None:
+            self.delivered += 1
+            self.callback(StreamTickRecord.from_dict(data))
+            return
+
+        key = (data.get("symbol"), data.get("level"))
+        if key in self._latest:
+            self.coalesced += 1
+        self._latest[key] = data
+        self._ready.set()
+
+    async def __anext__(self):
+        self._dispatcher.start()
+
+        while not self._latest:
+            if self.closed:
+                if self._error is not None:
+                    raise self._error
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+
+        key = next(iter(self._latest))
+        self.delivered += 1
+        return StreamTickRecord.from_dict(self._latest.pop(key))
+
+
+class StreamDispatcher:
+    """
+    Reads a Stream connection in a background task and routes every message to the subscriptions of its topic.
+    The task is started by the first subscription that is iterated, so it must not be combined with `Stream.listen()`.
+
+    When the stream drops, `on_closed(error)` is awaited if set; returning True means the session was restored and
+    reading resumes with the subscriptions intact, False means the stream was closed on purpose and every subscription
+    ends normally. Without `on_closed`, or when it raises, every subscription is closed with the error.
+    """
+
+    def __init__(self, stream, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.stream = stream
+        self.maxsize = maxsize
+        self.unrouted = 0
+        self.errors = 0                 # Exceptions raised by subscription callbacks
+        self.last_message = None
+        self.logger = logging.getLogger(__class__.__name__)
+        self.on_closed: Optional[Callable] = None
+        self._subscriptions = collections.defaultdict(list)
+        self._task = None
+
+    def subscribe(self, command: str, symbol: Optional[str] = None, maxsize: int = None,
+                  callback: Optional[Callable] = None, conflate: bool = False) -> Subscription:
+        """
+        Returns a new subscription for the messages of `command` (and `symbol`, if given).
+        With `conflate` the subscription keeps only the newest tick per symbol and price level.
+        """
+
+        if conflate:
+            subscription = ConflatingSubscription(self, command, symbol, callback)
+        else:
+            subscription = Subscription(self, command, symbol, maxsize or self.maxsize, callback)
+        return self.add(subscription)
+
+    def add(self, subscription: Subscription) -> Subscription:
+        self._subscriptions[subscription.topic].append(subscription)
+        if subscription.callback is not None:
+            self.start()
+        return subscription
+
+    def unsubscribe(self, command: str, symbol: Optional[str] = None):
+        """Closes and removes every subscription of a topic."""
+
+        for subscription in self._subscriptions.pop((command, symbol), []):
+            subscription.close()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def dispatch(self, message: dict):
+        """Routes one decoded stream message to the subscriptions of its topic."""
+
+        command = message.get("command")
+        data = message.get("data")
+        symbol = data.get("symbol") if isinstance(data, dict) else None
+
+        routed = False
+        for topic in ((command, symbol), (command, None)) if symbol is not None else ((command, None),):
+            for subscription in self._subscriptions.get(topic, ()):
+                # A failing callback must not end the reader task, every other subscription would stop receiving data.
+                try:
+                    subscription.put(data)
+                except Exception:
+                    self.errors += 1
+                    self.logger.exception(f"Callback of {command}:{symbol} subscription failed")
+                routed = True
+
+        if not routed:
+            self.unrouted += 1
+
+    def stats(self) -> dict:
+        """Returns depth, delivered and dropped counters keyed by 'command' or 'command:symbol'."""
+
+        stats = {}
+        for (command, symbol), subscriptions in self._subscriptions.items():
+            key = command if symbol is None else f"{command}:{symbol}"
+            for index, subscription in enumerate(subscriptions):
+                stats[key if index == 0 else f"{key}#{index}"] = subscription.stats()
+        return stats
+
+    async def _run(self):
+        while True:
+            connection = self.stream._conn
+            try:
+                async for message in self.stream.listen():
+                    self.last_message = time.monotonic()
+                    self.dispatch(message)
+                error = None
+            except ConnectionClosed as e:
+                error = e
+
+            # The stream was already re-opened by someone else (e.g. the heartbeat), keep reading the new one.
+            if self.stream._conn is not None and self.stream._conn is not connection:
+                continue
+
+            try:
+                if self.on_closed is not None:
+                    if await self.on_closed(error or ConnectionClosed("Connection closed")):
+                        continue
+                    error = None
+            except Exception as e:
+                error = e
+            break
+
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.close(error)
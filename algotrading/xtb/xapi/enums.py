@@ -77,4 +77,11 @@ class TimeInt(IntEnum):
     DAYS  = 86400000
     WEEKS = 604800000
     MONTHS = 2629743000
-    YEARS = 31556926000
\ No newline at end of file
+    YEARS = 31556926000
+
+class RequestPriority(IntEnum):
+    """ Scheduling lane of a request in the rate limiter, lower values are sent first. """
+    TRADE = 0       # tradeTransaction, tradeTransactionStatus
+    ACCOUNT = 1     # margin, trades and other account queries
+    MARKET = 2      # symbols, ticks, server time and stream subscriptions
+    HISTORY = 3     # chart and history downloads
@@ -6,4 +6,9 @@ class LoginFailed(Exception):
 class ConnectionClosed(Exception):
     """
     Raised when a connection has never been opened or closed unexpectedly.
-    """
\ No newline at end of file
+    """
+
+class CommandNotSent(ConnectionClosed):
+    """
+    Raised when a command could not be sent because the connection is closed, the server never received it.
+    """
@@ -0,0 +1,104 @@
+from .columnar import ChartColumns, FRAME_VERSION
+
+from typing import Callable, Dict
+import collections
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+"""
+
+Content addressed cache of frames built from chart columns.
+
+A frame is keyed by a BLAKE2 hash of the column bytes and digits it was built from, and of the builder: its name, its
+bytecode and a version (FRAME_VERSION for the ChartColumns builders). Repeated backtests over unchanged candles skip
+building it, while any change to the candles or the builder is a different key. Frames are kept in memory and pickled
+to `path`, where other processes and later runs find them too, both holding at most `max_entries` frames with the least
+recently used one evicted first.
+
+    cache = FrameCache(os.path.join("algotrading", "backtest_data", "frames"))
+    df = cache.get(columns, ChartColumns.to_ohlcv_frame)
+
+"""
+
+_COLUMNS = ("ctm", "open", "high", "low", "close", "vol")
+
+
+def content_hash(columns: ChartColumns, salt: str = "") -> str:
+    """Returns the hex BLAKE2b digest of the digits and column bytes of `columns`."""
+
+    digest = hashlib.blake2b(f"{salt}:{columns.digits}:{len(columns)}".encode(), digest_size=20)
+    for column in _COLUMNS:
+        digest.update(memoryview(np.ascontiguousarray(getattr(columns, column))).cast("B"))
+    return digest.hexdigest()
+
+
+def builder_salt(build: Callable, version: int) -> str:
+    """Returns the part of a frame key identifying the builder, changing with its name, bytecode and `version`."""
+
+    code = getattr(build, "__code__", None)
+    digest = hashlib.blake2b(code.co_code + repr(code.co_names).encode(), digest_size=8).hexdigest() if code else ""
+    return f"{getattr(build, '__qualname__', '')}:{version}:{digest}"
+
+
+class FrameCache:
+    """Frames built from ChartColumns, cached in memory and as pickles in `path`."""
+
+    def __init__(self, path: str, max_entries: int = 8):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._frames: Dict[str, pd.DataFrame] = collections.OrderedDict()
+        os.makedirs(path, exist_ok=True)
+
+    def file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.pkl")
+
+    def get(self, columns: ChartColumns, build: Callable[[ChartColumns], pd.DataFrame], version: int = FRAME_VERSION) -> pd.DataFrame:
+        """Returns a copy of the frame `build(columns)`, building it only if no frame of the same content is cached."""
+
+        key = content_hash(columns, builder_salt(build, version))
+
+        df = self._frames.get(key)
+        if df is not None:
+            self.hits += 1
+            self._frames.move_to_end(key)
+            return df.copy()
+
+        file = self.file(key)
+        if os.path.exists(file):
+            self.disk_hits += 1
+            df = pd.read_pickle(file)
+            os.utime(file)
+        else:
+            self.misses += 1
+            df = build(columns)
+            df.to_pickle(file + ".tmp")
+            os.replace(file + ".tmp", file)
+            self._evict_files()
+
+        self._frames[key] = df
+        while len(self._frames) > self.max_entries:
+            self._frames.popitem(last=False)
+        return df.copy()
+
+    def _evict_files(self):
+        """Deletes the least recently used pickles beyond `max_entries`, their modification time is their last use."""
+
+        files = [os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".pkl")]
+        files.sort(key=os.path.getmtime)
+        for file in files[:max(0, len(files) - self.max_entries)]:
+            os.remove(file)
+
+    def clear(self, disk: bool = False):
+        """Empties the memory cache, and the pickles in `path` if `disk`."""
+
+        self._frames.clear()
+        if disk:
+            for name in os.listdir(self.path):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.path, name))
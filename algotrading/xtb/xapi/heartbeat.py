@@ -0,0 +1,146 @@
+from .exceptions import ConnectionClosed
+from .records import StreamingKeepAliveRecord
+
+from typing import Optional
+import asyncio
+import logging
+import time
+
+"""
+
+Keep-alive handling for the socket and stream connections.
+
+The xAPI drops sessions that stay silent for too long, so the heartbeat pings a connection only when no command has been
+sent on it for `idle` seconds. The stream 'keepAlive' subscription (one message every 3 seconds) tells a
+dead stream apart from a quiet market: when no keep-alive arrived for `keep_alive_timeout` seconds the stream is
+marked dead and, if the session reconnects automatically, it is reconnected before the next trade needs it.
+
+"""
+
+
+class ConnectionHealth:
+    """Liveness and round-trip time measurements of one connection."""
+
+    def __init__(self, smoothing: float = 0.2):
+        self.smoothing = smoothing
+        self.pings = 0
+        self.failures = 0
+        self.rtt_last: Optional[float] = None
+        self.rtt_avg: Optional[float] = None
+        self.rtt_min: Optional[float] = None
+        self.rtt_max: Optional[float] = None
+        self.keep_alives = 0
+        self.last_keep_alive: Optional[float] = None
+        self.last_keep_alive_timestamp: Optional[int] = None
+        self.alive = True
+
+    def record_rtt(self, seconds: float):
+        """Adds a measured round trip, `rtt_avg` is an exponentially weighted moving average."""
+
+        self.pings += 1
+        self.rtt_last = seconds
+        self.rtt_avg = seconds if self.rtt_avg is None else self.rtt_avg + self.smoothing * (seconds - self.rtt_avg)
+        self.rtt_min = seconds if self.rtt_min is None else min(self.rtt_min, seconds)
+        self.rtt_max = seconds if self.rtt_max is None else max(self.rtt_max, seconds)
+
+    def record_keep_alive(self, record: StreamingKeepAliveRecord):
+        self.keep_alives += 1
+        self.last_keep_alive = time.monotonic()
+        self.last_keep_alive_timestamp = record.timestamp
+        self.alive = True
+
+    def snapshot(self) -> dict:
+        return {
+            "alive": self.alive,
+            "pings": self.pings,
+            "failures": self.failures,
+            "rtt_last": self.rtt_last,
+            "rtt_avg": self.rtt_avg,
+            "rtt_min": self.rtt_min,
+            "rtt_max": self.rtt_max,
+            "keep_alives": self.keep_alives,
+            "last_keep_alive_timestamp": self.last_keep_alive_timestamp,
+        }
+
+
+class Heartbeat:
+    """
+    Background task pinging idle connections of an XAPI session and watching the stream keep-alive messages.
+    The keep-alive subscription uses the stream dispatcher, so it must not be combined with `Stream.listen()`.
+
+    Parameters
+    ----------
+    `xapi` : `XAPI`
+        The session to keep alive
+    `idle` : `float`, `optional`
+        Seconds without a sent command after which a connection is pinged (default is `30.0`)
+    `keep_alive_timeout` : `float`, `optional`
+        Seconds without a stream keep-alive message after which the stream is considered dead (default is `10.0`)
+    `interval` : `float`, `optional`
+        Seconds between checks (default is `1.0`)
+    """
+
+    def __init__(self, xapi, idle: float = 30.0, keep_alive_timeout: float = 10.0, interval: float = 1.0):
+        self.xapi = xapi
+        self.idle = idle
+        self.keep_alive_timeout = keep_alive_timeout
+        self.interval = interval
+        self.logger = logging.getLogger(__class__.__name__)
+        self._task = None
+
+    async def start(self):
+        if self._task is not None and not self._task.done():
+            return
+
+        stream = self.xapi.stream
+        stream.health.last_keep_alive = time.monotonic()
+        await stream.getKeepAlive(
+            callback=lambda data: stream.health.record_keep_alive(StreamingKeepAliveRecord.from_dict(data))
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except ConnectionClosed as e:
+                self.logger.info(f"Heartbeat failed: {e}")
+
+    async def check(self):
+        """Pings idle connections and reconnects a dead stream when the session reconnects automatically."""
+
+        now = time.monotonic()
+        socket, stream = self.xapi.socket, self.xapi.stream
+
+        for connection in getattr(socket, "sockets", [socket]):
+            if now - connection.last_request >= self.idle:
+                # Timed from the actual send, time queued in the rate limiter behind other commands is not latency.
+                timing = []
+                try:
+                    await connection.ping(timing=timing)
+                except ConnectionClosed:
+                    connection.health.failures += 1
+                    raise
+                connection.health.record_rtt(timing[1] - timing[0])
+
+        if now - stream.last_request >= self.idle:
+            await stream.ping()
+
+        if now - stream.health.last_keep_alive >= self.keep_alive_timeout:
+            stream.health.alive = False
+            stream.health.failures += 1
+            self.logger.info(f"No stream keep-alive for {now - stream.health.last_keep_alive:.1f}s")
+
+            if self.xapi.auto_reconnect:
+                await self.xapi.reconnect("keep-alive timeout")
+                stream.health.last_keep_alive = time.monotonic()
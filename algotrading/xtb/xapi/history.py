@@ -0,0 +1,117 @@
+from .enums import PeriodCode
+from .backfill import available_since, backfill, DEFAULT_CHUNK_CANDLES
+from .store import ColumnStore
+
+from dataclasses import dataclass
+from typing import Optional
+import logging
+import time
+
+import numpy as np
+
+"""
+
+Incremental chart history cache.
+
+Candles are kept per (symbol, PeriodCode) in a ColumnStore. A refresh only requests the candles from the newest stored
+`ctm` onwards: the newest stored candle may still have been forming when it was saved, so it is fetched again and
+replaced together with everything after it, the older candles and months are reused as they are. The first fill of
+an empty cache reaches back further than the server keeps fine periods, so its older part is filled with coarser
+candles (see `backfill.plan`). Those are stored under their own period, the requested period only ever holds candles of
+that period and starts where the server still has it.
+
+    cache = HistoryCache(ColumnStore(os.path.join("algotrading", "backtest_data", "store")))
+    columns, stats = await cache.refresh(connector.socket, "GBPJPY", PeriodCode.PERIOD_M15, start)
+
+"""
+
+
+@dataclass
+class RefreshStats:
+    symbol: str
+    period: PeriodCode
+    rows_reused: int = 0            # Stored candles kept as they were
+    rows_fetched: int = 0           # Candles received from the server, including the refetched forming candle
+    bytes_reused: int = 0           # Size of the stored candles on disk
+    bytes_fetched: int = 0          # Size of the chart responses received
+    requests: int = 0               # Chart requests sent
+    elapsed: float = 0.0            # Seconds the refresh took
+
+    def __str__(self) -> str:
+        return (f"{self.symbol} {self.period.name}: reused {self.rows_reused} rows ({self.bytes_reused} bytes), "
+                f"fetched {self.rows_fetched} rows ({self.bytes_fetched} bytes) in {self.requests} requests, "
+                f"{self.elapsed:.2f}s")
+
+
+def _response_bytes(socket) -> float:
+    """Total chart response bytes received by a Socket or SocketPool, from its connection metrics."""
+
+    sockets = getattr(socket, "sockets", [socket])
+    return sum(
+        s.metrics.commands["getChartRangeRequest"].bytes.total
+        for s in sockets if "getChartRangeRequest" in s.metrics.commands
+    )
+
+
+class HistoryCache:
+    """Keeps the candles per (symbol, PeriodCode) of a ColumnStore up to date."""
+
+    def __init__(self, store: ColumnStore, logger: logging.Logger = None):
+        self.store = store
+        self.logger = logger or logging.getLogger("xapi.history")
+
+    def last_ctm(self, symbol: str, period: PeriodCode) -> Optional[int]:
+        return self.store.last_ctm(symbol, period)
+
+    async def refresh(self, socket, symbol: str, period: PeriodCode, start: int, now: int = None,
+                      chunk_candles: int = DEFAULT_CHUNK_CANDLES):
+        """
+        Brings the stored candles of `symbol` up to date and returns (ChartColumns from `start`, RefreshStats).
+
+        Parameters
+        ----------
+        `socket` : `Socket` or `SocketPool`
+            The connection to send getChartRangeRequest on
+        `start` : `int`
+            Oldest candle time in milliseconds to download when nothing is stored yet
+        """
+
+        began = time.perf_counter()
+        now = int(time.time() * 1000) if now is None else now
+        stats = RefreshStats(symbol, PeriodCode(period))
+
+        # Candles from the newest stored one onwards are fetched again, it may have been stored while still forming.
+        last = self.store.last_ctm(symbol, period)
+        since = start if last is None else last
+        stored = sum(self.store.manifest[key]["rows"] for key in self.store.partitions(symbol, period))
+        stored_bytes = self.store.size(symbol, period)
+
+        # The first fill reaches back past the availability window of `period`, the older part is filled with the
+        # finest coarser period still available instead of being left out. Refreshes only need the recent tail.
+        received = _response_bytes(socket)
+        result = await backfill(socket, symbol, since, now + 1, period, now=now + 1, chunk_candles=chunk_candles,
+                                fallback=last is None, logger=self.logger)
+        stats.bytes_fetched = int(_response_bytes(socket) - received)
+        stats.requests = len(result.chunks)
+        stats.rows_fetched = len(result.columns)
+
+        coarser = sorted({chunk.period for chunk in result.chunks if chunk.period != period})
+        if coarser:
+            self.logger.warning(f"{symbol} {PeriodCode(period).name} is only available from {available_since(period, now + 1)}, "
+                                f"the older candles are stored as {', '.join(code.name for code in coarser)}")
+        if result.chunks and result.chunks[-1].start > since:
+            self.logger.warning(f"{symbol} {PeriodCode(period).name} is no longer available back to {since}, the cache has a gap")
+        if result.failed:
+            self.logger.warning(f"Refresh of {symbol} {PeriodCode(period).name} incomplete, {len(result.failed)} requests returned no data")
+
+        # Every candle goes to the partitions of the period it was requested at, coarser candles must not be read as
+        # candles of `period`.
+        for code in np.unique(result.periods):
+            self.store.write(symbol, PeriodCode(code), result.columns.take(result.periods == code))
+
+        if last is not None:
+            stats.rows_reused = stored - int(np.count_nonzero(result.columns.ctm[result.periods == period] <= last))
+            stats.bytes_reused = stored_bytes
+        stats.elapsed = time.perf_counter() - began
+        self.logger.info(str(stats))
+        return self.store.read_chart(symbol, period, start), stats
@@ -0,0 +1,140 @@
+from typing import Optional
+import collections
+import functools
+import bisect
+import asyncio
+import logging
+
+"""
+
+Per command latency and size statistics of a connection.
+
+Every command records its rate limiter queue wait, the time spent in the websocket send, the server round trip (from
+the end of the send to the arrival of the response), the decode time and the response size in bytes. Values go into
+log-linear bucketed histograms: recording is one bisect and a few additions, and percentiles are accurate to the
+bucket width (about 9% with the default of 8 buckets per doubling).
+
+"""
+
+@functools.lru_cache(maxsize=None)
+def _bucket_bounds(lowest: float, highest: float, buckets_per_doubling: int) -> tuple:
+    factor = 2 ** (1 / buckets_per_doubling)
+    bounds = []
+    bound = lowest
+    while bound < highest:
+        bounds.append(bound)
+        bound *= factor
+    return tuple(bounds)
+
+
+class Histogram:
+    """Log-linear bucketed histogram of positive values."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "min", "max")
+
+    def __init__(self, lowest: float = 1e-6, highest: float = 100.0, buckets_per_doubling: int = 8):
+        self.bounds = _bucket_bounds(lowest, highest, buckets_per_doubling)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Returns the upper bound of the bucket holding the `q` quantile (0 to 1), capped by the largest value seen."""
+
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class CommandMetrics:
+    """Histograms of one command, times are in seconds and sizes in bytes."""
+
+    __slots__ = ("queue_wait", "send", "round_trip", "decode", "bytes", "errors")
+
+    def __init__(self):
+        self.queue_wait = Histogram()
+        self.send = Histogram()
+        self.round_trip = Histogram()
+        self.decode = Histogram()
+        self.bytes = Histogram(lowest=1.0, highest=1e10)
+        self.errors = 0
+
+    def snapshot(self) -> dict:
+        snapshot = {name: getattr(self, name).snapshot() for name in ("queue_wait", "send", "round_trip", "decode", "bytes")}
+        snapshot["bytes"]["total"] = self.bytes.total
+        snapshot["errors"] = self.errors
+        return snapshot
+
+
+class ConnectionMetrics:
+    """Per command metrics of one connection, keyed by command name (stream messages by their 'command' field)."""
+
+    def __init__(self):
+        self.commands = collections.defaultdict(CommandMetrics)
+
+    def __getitem__(self, command: str) -> CommandMetrics:
+        return self.commands[command]
+
+    def reset(self):
+        self.commands.clear()
+
+    def snapshot(self) -> dict:
+        return {command: metrics.snapshot() for command, metrics in self.commands.items()}
+
+
+def format_snapshot(snapshot: dict) -> str:
+    """Formats a ConnectionMetrics snapshot as one line per command with p50/p99 times in milliseconds."""
+
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.2f}"
+
+    lines = []
+    for command, metrics in sorted(snapshot.items()):
+        lines.append(
+            f"{command}: n={metrics['decode']['count']} "
+            f"queue p50/p99={ms(metrics['queue_wait']['p50'])}/{ms(metrics['queue_wait']['p99'])}ms "
+            f"rtt p50/p99={ms(metrics['round_trip']['p50'])}/{ms(metrics['round_trip']['p99'])}ms "
+            f"decode p50/p99={ms(metrics['decode']['p50'])}/{ms(metrics['decode']['p99'])}ms "
+            f"bytes={int(metrics['bytes']['total'])} errors={metrics['errors']}"
+        )
+    return "\n".join(lines)
+
+
+async def log_metrics(snapshot, interval: float = 60.0, logger: logging.Logger = None):
+    """Logs `snapshot()` (a callable returning {name: ConnectionMetrics snapshot}) every `interval` seconds until cancelled."""
+
+    logger = logger or logging.getLogger("xapi.metrics")
+    while True:
+        await asyncio.sleep(interval)
+        for name, metrics in snapshot().items():
+            if metrics:
+                logger.info(f"{name} metrics\n{format_snapshot(metrics)}")
@@ -0,0 +1,263 @@
+from .enums import PeriodCode
+
+from typing import Callable, Dict, List, Optional
+import datetime
+import itertools
+import asyncio
+import random
+import json
+import time
+
+import websockets.server
+import websockets.exceptions
+
+"""
+
+A local stand-in for the xStation5 websocket API, for offline throughput and latency benchmarks.
+
+The server speaks enough of the xAPI protocol for Socket, Stream, XAPI and Client: login, the common socket commands
+(every other command answers with an empty successful response), 'customTag' echoing, and the stream subscriptions
+for ticks, candles and keep-alive messages. Socket responses can be delayed by a fixed `latency`, chart responses
+contain as many candles as the requested range holds (or `chart_candles` if set), and ticks are produced for every
+subscribed symbol at `tick_rate` ticks per second per symbol by a replaceable `tick_generator`.
+
+    async with MockXTBServer(tick_rate=50) as server:
+        connector = await xapi.connect("1", "password", host=server.url, type="demo")
+
+"""
+
+
+def random_walk_ticks(start: float = 1.0, step: float = 0.0001) -> Callable[[str, int], dict]:
+    """Returns a tick generator producing a random walk of bid/ask quotes per symbol."""
+
+    prices = {}
+
+    def generate(symbol: str, timestamp: int) -> dict:
+        bid = prices.get(symbol, start) + random.choice((-step, step))
+        prices[symbol] = bid
+        ask = bid + 2 * step
+        return {
+            "ask": round(ask, 6), "askVolume": 1000000, "bid": round(bid, 6), "bidVolume": 1000000,
+            "high": round(ask, 6), "level": 0, "low": round(bid, 6), "quoteId": 2,
+            "spreadRaw": round(ask - bid, 6), "spreadTable": 2.0, "symbol": symbol, "timestamp": timestamp
+        }
+
+    return generate
+
+
+class MockXTBServer:
+    """
+    Parameters
+    ----------
+    `host` : `str`, `optional`
+        Interface to listen on (default is `localhost`)
+    `port` : `int`, `optional`
+        Port to listen on, `0` picks a free port (default is `0`)
+    `latency` : `float`, `optional`
+        Seconds added before every socket response (default is `0.0`)
+    `tick_rate` : `float`, `optional`
+        Ticks per second per subscribed symbol (default is `10.0`)
+    `tick_generator` : `Callable[[str, int], dict]`, `optional`
+        Produces the tick data of a symbol at a millisecond timestamp (default is a random walk)
+    `chart_candles` : `int`, `optional`
+        Fixed number of candles in chart responses instead of the requested range (default is `None`)
+    `keep_alive_interval` : `float`, `optional`
+        Seconds between stream keep-alive messages (default is `3.0`)
+    `password` : `str`, `optional`
+        The only accepted password, any password is accepted if `None` (default is `None`)
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 0, latency: float = 0.0, tick_rate: float = 10.0,
+                 tick_generator: Callable[[str, int], dict] = None, chart_candles: Optional[int] = None,
+                 keep_alive_interval: float = 3.0, password: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.tick_rate = tick_rate
+        self.tick_generator = tick_generator or random_walk_ticks()
+        self.chart_candles = chart_candles
+        self.keep_alive_interval = keep_alive_interval
+        self.password = password
+
+        self.logins = 0
+        self.commands: Dict[str, int] = {}
+        self.ticks_sent = 0
+        self._server = None
+        self._connections = set()
+        self._sessions = itertools.count(1)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.server.serve(self._handler, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    async def drop_connections(self, code: int = 1011):
+        """Closes every open client connection, e.g. to benchmark reconnect storms."""
+        await asyncio.gather(*(ws.close(code) for ws in list(self._connections)), return_exceptions=True)
+
+    async def _handler(self, ws):
+        self._connections.add(ws)
+        try:
+            if ws.path.endswith("Stream"):
+                await self._stream(ws)
+            else:
+                await self._socket(ws)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self._connections.discard(ws)
+
+    async def _socket(self, ws):
+        async for message in ws:
+            command = json.loads(message)
+            name = command.get("command")
+            self.commands[name] = self.commands.get(name, 0) + 1
+
+            if self.latency:
+                await asyncio.sleep(self.latency)
+
+            response = self.respond(name, command.get("arguments", {}))
+            if "customTag" in command:
+                response["customTag"] = command["customTag"]
+            await ws.send(json.dumps(response))
+
+    def respond(self, command: str, arguments: dict) -> dict:
+        """Returns the response of a socket command."""
+
+        now = int(time.time() * 1000)
+
+        if command == "login":
+            if self.password is not None and arguments.get("password") != self.password:
+                return {"status": False, "errorCode": "BE005", "errorDescr": "userPasswordCheck: Invalid login or password"}
+            self.logins += 1
+            return {"status": True, "streamSessionId": f"mock-{next(self._sessions)}"}
+
+        if command == "getServerTime":
+            return {"status": True, "returnData": {"time": now, "timeString": datetime.datetime.fromtimestamp(now / 1000).strftime("%b %d, %Y, %I:%M:%S %p")}}
+
+        if command == "getSymbol":
+            return {"status": True, "returnData": self.symbol_record(arguments.get("symbol"), now)}
+
+        if command == "getAllSymbols":
+            return {"status": True, "returnData": [self.symbol_record(symbol, now) for symbol in ("EURUSD", "GBPJPY", "GBPUSD")]}
+
+        if command in ("getChartLastRequest", "getChartRangeRequest"):
+            info = arguments.get("info", {})
+            return {"status": True, "returnData": self.chart(info.get("period", 1), info.get("start", now), info.get("end") or now)}
+
+        if command == "getTradingHours":
+            week = [{"day": day, "fromT": 0, "toT": 86400000} for day in range(1, 6)]
+            return {"status": True, "returnData": [
+                {"symbol": symbol, "quotes": week, "trading": week} for symbol in arguments.get("symbols", [])
+            ]}
+
+        if command == "tradeTransaction":
+            return {"status": True, "returnData": {"order": now}}
+
+        return {"status": True, "returnData": {}}
+
+    def symbol_record(self, symbol: str, now: int) -> dict:
+        tick = self.tick_generator(symbol, now)
+        return {
+            "ask": tick["ask"], "bid": tick["bid"], "categoryName": "FX", "contractSize": 100000, "currency": symbol[:3],
+            "currencyPair": True, "currencyProfit": symbol[3:], "description": symbol, "expiration": None,
+            "groupName": "Major", "high": tick["high"], "initialMargin": 0, "instantMaxVolume": 0, "leverage": 3.33,
+            "longOnly": False, "lotMax": 100.0, "lotMin": 0.01, "lotStep": 0.01, "low": tick["low"], "marginHedged": 0,
+            "marginHedgedStrong": False, "marginMaintenance": 0, "marginMode": 101, "percentage": 100.0,
+            "pipsPrecision": 4, "precision": 5, "profitMode": 5, "quoteId": 2, "quoteIdCross": 4, "shortSelling": True,
+            "spreadRaw": tick["spreadRaw"], "spreadTable": tick["spreadTable"], "starting": None, "stepRuleId": 1,
+            "stopsLevel": 0, "swap_rollover3days": 0, "swapEnable": True, "swapLong": -1.0, "swapShort": -1.0,
+            "swapType": 1, "symbol": symbol, "tickSize": 0.00001, "tickValue": 1.0, "time": now,
+            "timeString": str(now), "trailingEnabled": True, "type": 21, "exemode": 1
+        }
+
+    def chart(self, period: int, start: int, end: int) -> dict:
+        step = PeriodCode(period).value * 60000
+        first = start - start % step
+        candles = self.chart_candles if self.chart_candles is not None else max(0, (end - first) // step + 1)
+        if self.chart_candles is not None:
+            first = end - end % step - candles * step
+
+        price = 100000
+        rate_infos = []
+        for index in range(candles):
+            ctm = first + index * step
+            price += random.randint(-50, 50)
+            rate_infos.append({
+                "ctm": ctm,
+                "ctmString": datetime.datetime.fromtimestamp(ctm / 1000).strftime("%b %d, %Y, %I:%M:%S %p"),
+                "open": price, "close": random.randint(-30, 30), "high": random.randint(0, 40),
+                "low": random.randint(-40, 0), "vol": float(random.randint(1, 1000))
+            })
+        return {"digits": 5, "rateInfos": rate_infos}
+
+    async def _stream(self, ws):
+        symbols: List[str] = []
+        tasks = [asyncio.create_task(self._ticks(ws, symbols))]
+        try:
+            async for message in ws:
+                command = json.loads(message)
+                name = command.get("command")
+                self.commands[name] = self.commands.get(name, 0) + 1
+
+                if name == "getTickPrices" and command.get("symbol") not in symbols:
+                    symbols.append(command.get("symbol"))
+                elif name == "stopTickPrices" and command.get("symbol") in symbols:
+                    symbols.remove(command.get("symbol"))
+                elif name == "getKeepAlive":
+                    tasks.append(asyncio.create_task(self._keep_alive(ws)))
+                elif name == "getCandles":
+                    tasks.append(asyncio.create_task(self._candles(ws, command.get("symbol"))))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _ticks(self, ws, symbols: List[str]):
+        """Sends `tick_rate` ticks per second for every subscribed symbol, in batches of at least 1ms."""
+
+        sent = 0
+        start = time.monotonic()
+        while True:
+            await asyncio.sleep(0.001)
+            if not symbols:
+                sent, start = 0, time.monotonic()
+                continue
+
+            due = int((time.monotonic() - start) * self.tick_rate * len(symbols)) - sent
+            now = int(time.time() * 1000)
+            for index in range(sent, sent + due):
+                symbol = symbols[index % len(symbols)]
+                await ws.send(json.dumps({"command": "tickPrices", "data": self.tick_generator(symbol, now)}))
+            sent += due
+            self.ticks_sent += due
+
+    async def _keep_alive(self, ws):
+        while True:
+            await ws.send(json.dumps({"command": "keepAlive", "data": {"timestamp": int(time.time() * 1000)}}))
+            await asyncio.sleep(self.keep_alive_interval)
+
+    async def _candles(self, ws, symbol: str):
+        while True:
+            await asyncio.sleep(60 - time.time() % 60)
+            tick = self.tick_generator(symbol, int(time.time() * 1000))
+            ctm = int(time.time() // 60 * 60 * 1000) - 60000
+            await ws.send(json.dumps({"command": "candle", "data": {
+                "close": tick["bid"], "ctm": ctm, "ctmString": str(ctm), "high": tick["high"], "low": tick["low"],
+                "open": tick["bid"], "quoteId": 2, "symbol": symbol, "vol": 1.0
+            }}))
@@ -0,0 +1,56 @@
+from .enums import TradeCmd
+
+import numpy as np
+
+"""
+
+Fixed-point prices.
+
+XTB prices have a fixed number of decimal places per symbol (`digits`, the symbol `precision`), and chart candles
+already arrive as integers scaled by 10 ** digits. Kept as integer points, comparisons, spreads and price differences
+are exact and cheap; conversion to floats only happens at the edges (display, orders sent to the API).
+
+    to_points(185.123, 3) == 185123
+    spread_points(185.120, 185.123, 3) == 3
+    profit(TradeCmd.BUY, 185123, 185223, volume=0.1, contract_size=100000, digits=3) == 1000.0
+
+"""
+
+
+def to_points(price, digits: int):
+    """Returns a price (float or array) in integer points of 10 ** -digits, rounded to the nearest point."""
+
+    if isinstance(price, np.ndarray):
+        return np.rint(price * 10 ** digits).astype(np.int64)
+    return round(price * 10 ** digits)
+
+
+def to_price(points, digits: int):
+    """Returns integer points (int or array) as a float price."""
+    return points / 10 ** digits
+
+
+def pip_points(precision: int, pips_precision: int) -> int:
+    """Returns the points in one pip, e.g. 10 for GBPJPY (precision 3, pipsPrecision 2)."""
+    return 10 ** (precision - pips_precision)
+
+
+def spread_points(bid, ask, digits: int):
+    """Returns the spread of float quotes in integer points."""
+    return to_points(ask, digits) - to_points(bid, digits)
+
+
+def profit_points(cmd: TradeCmd, open_points, close_points):
+    """Returns the price move of a position in its favour, in points (negative for a loss)."""
+    return close_points - open_points if cmd in (TradeCmd.BUY, TradeCmd.BUY_LIMIT, TradeCmd.BUY_STOP) else open_points - close_points
+
+
+def profit(cmd: TradeCmd, open_points, close_points, volume: float, contract_size: int, digits: int):
+    """
+    Returns the profit of a position in the profit currency of the symbol. The price move and contract size are
+    multiplied as integers, volume (lots in steps of 0.01) is applied as hundredths, and the single division by
+    10 ** digits happens last.
+    """
+
+    hundredths = round(volume * 100)
+    return profit_points(cmd, open_points, close_points) * contract_size * hundredths / (100 * 10 ** digits)
@@ -0,0 +1,151 @@
+from .enums import RequestPriority
+
+import itertools
+import asyncio
+import heapq
+import time
+
+"""
+
+Token bucket scheduler for outgoing xAPI commands.
+
+The xAPI expects at most one request per 200ms on average. Instead of sleeping a fixed 200ms after every send,
+the bucket refills at `rate` tokens per second up to `burst` tokens, so idle time is banked and a burst of commands
+goes out immediately. When the bucket is empty, waiting requests are released in priority order (trade commands first,
+history downloads last) and FIFO within a lane.
+
+"""
+
+COMMAND_PRIORITIES = {
+    "tradeTransaction": RequestPriority.TRADE,
+    "tradeTransactionStatus": RequestPriority.TRADE,
+
+    "login": RequestPriority.ACCOUNT,
+    "logout": RequestPriority.ACCOUNT,
+    "getCurrentUserData": RequestPriority.ACCOUNT,
+    "getMarginLevel": RequestPriority.ACCOUNT,
+    "getMarginTrade": RequestPriority.ACCOUNT,
+    "getCommissionDef": RequestPriority.ACCOUNT,
+    "getProfitCalculation": RequestPriority.ACCOUNT,
+    "getTrades": RequestPriority.ACCOUNT,
+    "getTradeRecords": RequestPriority.ACCOUNT,
+    "getBalance": RequestPriority.ACCOUNT,
+    "getProfits": RequestPriority.ACCOUNT,
+    "getTradeStatus": RequestPriority.ACCOUNT,
+
+    "getChartLastRequest": RequestPriority.HISTORY,
+    "getChartRangeRequest": RequestPriority.HISTORY,
+    "getTradesHistory": RequestPriority.HISTORY,
+    "getIbsHistory": RequestPriority.HISTORY,
+    "getNews": RequestPriority.HISTORY,
+    "getCalendar": RequestPriority.HISTORY,
+}
+
+def command_priority(command: str) -> RequestPriority:
+    """Returns the priority lane of an xAPI command name, defaulting to `RequestPriority.MARKET`."""
+    return COMMAND_PRIORITIES.get(command, RequestPriority.MARKET)
+
+
+class RateLimiter:
+    """
+    Priority token bucket shared by every connection of a session.
+
+    Parameters
+    ----------
+    `rate` : `float`, `optional`
+        Tokens added per second, i.e. the sustained request rate (default is `5.0`, one request per 200ms)
+    `burst` : `int`, `optional`
+        Maximum number of banked tokens that can be sent back to back (default is `5`)
+    """
+
+    def __init__(self, rate: float = 5.0, burst: int = 5):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self._stats = {priority: [0, 0.0, 0.0] for priority in RequestPriority}
+
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available."""
+        self._refill()
+        return self._tokens
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a token."""
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def stats(self) -> dict:
+        """Returns per lane request count, total and maximum time (in seconds) spent waiting for a token."""
+        return {
+            priority.name: {"requests": count, "wait_total": total, "wait_max": longest}
+            for priority, (count, total, longest) in self._stats.items()
+        }
+
+    async def acquire(self, priority: RequestPriority = RequestPriority.MARKET) -> float:
+        """Waits for a token in the given lane and returns the time spent queued, in seconds."""
+
+        start = time.monotonic()
+        self._refill()
+
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self._record(priority, 0.0)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._release()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The token was granted but never used, give it back.
+            if future.done() and not future.cancelled():
+                self._tokens = min(self.burst, self._tokens + 1)
+                self._release()
+            raise
+
+        waited = time.monotonic() - start
+        self._record(priority, waited)
+        return waited
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _release(self):
+        """Hands out available tokens to the highest priority waiters and schedules a wake up for the rest."""
+
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+        if self._waiters and self._timer is None:
+            delay = (1 - self._tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._release()
+
+    def _record(self, priority, waited):
+        stats = self._stats[priority]
+        stats[0] += 1
+        stats[1] += waited
+        stats[2] = max(stats[2], waited)
@@ -1,115 +1,91 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from operator import itemgetter
 from .enums import *
 from .request import *
 from typing import Optional
 import datetime
 
-@dataclass
+"""
+
+Records are slotted dataclasses: no per instance __dict__, smaller instances and faster attribute access on the tick
+and candle hot paths. `Record.from_dict(data)` builds a record from a response dict by passing its fields
+positionally, without keyword expansion; keys the record does not declare are ignored and missing keys become None.
+
+"""
+
+
+def record(cls):
+    """Turns `cls` into a slotted dataclass with a `from_dict` constructor."""
+
+    cls = dataclass(slots=True)(cls)
+    names = tuple(field.name for field in fields(cls))
+    # itemgetter of a single name returns the value instead of a 1-tuple.
+    values = itemgetter(*names) if len(names) > 1 else lambda data: (data[names[0]],)
+
+    def from_dict(data: dict):
+        try:
+            return cls(*values(data))
+        except KeyError:
+            return cls(*map(data.get, names))
+
+    cls.from_dict = staticmethod(from_dict)
+    return cls
+
+
+@record
 class SymbolRecord:
-    def __init__(
-        self,
-        ask: float,                  # Ask price in base currency
-        bid: float,                  # Bid price in base currency
-        categoryName: str,           # Category name
-        contractSize: int,           # Size of 1 lot
-        currency: str,               # Currency
-        currencyPair: bool,          # Indicates whether the symbol represents a currency pair
-        currencyProfit: str,         # The currency of calculated profit
-        description: str,            # Description
-        groupName: str,              # Symbol group name
-        high: float,                 # The highest price of the day in base currency
-        initialMargin: int,          # Initial margin for 1 lot order used for profit/margin calculation
-        instantMaxVolume: int,       # Maximum instant volume multiplied by 100 (in lots)
-        leverage: float,             # Symbol leverage
-        longOnly: bool,              # Long only
-        lotMax: float,               # Maximum size of trade
-        lotMin: float,               # Minimum size of trade
-        lotStep: float,              # A value of minimum step by which the size of trade can be changed (within lotMin - lotMax range)
-        low: float,                  # The lowest price of the day in base currency
-        marginHedged: int,           # Used for profit calculation
-        marginHedgedStrong: bool,    # For margin calculation
-        marginMaintenance: int,      # For margin calculation null if not applicable
-        marginMode: MarginMode,      # For margin calculation
-        percentage: float,           # Percentage
-        pipsPrecision: int,          # Number of symbol's pip decimal places
-        precision: int,              # Number of symbol's price decimal places
-        profitMode: ProfitMode,      # For profit calculation
-        quoteId: QuoteId,            # Source of price
-        quoteIdCross: int,
-        shortSelling: bool,          # Indicates whether short selling is allowed on the instrument
-        spreadRaw: float,            # The difference between raw ask and bid prices
-        spreadTable: float,          # Spread representation
-        stepRuleId: int,             # Appropriate step rule ID from getStepRules  command response
-        stopsLevel: int,             # Minimal distance (in pips) from the current price where the stopLoss/takeProfit can be set
-        swap_rollover3days: int,     # Time when additional swap is accounted for weekend
-        swapEnable: bool,            # Indicates whether swap value is added to position on end of day
-        swapLong: float,             # Swap value for long positions in pips
-        swapShort: float,            # Swap value for short positions in pips
-        swapType: int,               # Type of swap calculated
-        symbol: str,                 # Symbol name
-        timeString: str,             # Time in string
-        trailingEnabled: bool,       # Indicates whether trailing stop (offset) is applicable to the instrument.
-        type: int,                   # Instrument class number
-        exemode:int,                 # Mode of execution
-        
-        expiration: Optional[datetime.datetime] = None,  # Null if not applicable
-        starting: Optional[datetime.datetime] = None,    # Null if not applicable
-        tickSize: Optional[float] = None,                # Smallest possible price change, used for profit/margin calculation, null if not applicable
-        tickValue: Optional[float] = None,               # Value of smallest possible price change (in base currency), used for profit/margin calculation, null if not applicable
-        time: int = None                                # Ask & bid tick time. 13 long unixtime integer.
-    ):
-        self.ask = float = ask
-        self.bid = bid
-        self.categoryName = categoryName
-        self.contractSize = contractSize
-        self.currency = currency
-        self.currencyPair = currencyPair
-        self.currencyProfit = currencyProfit
-        self.description = description
-        self.groupName = groupName
-        self.high = high
-        self.initialMargin = initialMargin
-        self.instantMaxVolume = instantMaxVolume
-        self.leverage = leverage
-        self.longOnly = longOnly
-        self.lotMax = lotMax
-        self.lotMin = lotMin
-        self.lotStep = lotStep
-        self.low = low
-        self.marginHedged = marginHedged
-        self.marginHedgedStrong = marginHedgedStrong
-        self.marginMaintenance = marginMaintenance
-        self.marginMode = marginMode
-        self.percentage = percentage
-        self.pipsPrecision = pipsPrecision
-        self.precision = precision
-        self.profitMode = profitMode
-        self.quoteId = quoteId 
-        self.quoteIdCross = quoteIdCross
-        self.shortSelling = shortSelling
-        self.spreadRaw = float
-        self.spreadTable = float
-        self.stepRuleId = stepRuleId
-        self.stopsLevel = stopsLevel
-        self.swap_rollover3days = swap_rollover3days
-        self.swapEnable = swapEnable
-        self.swapLong = swapLong
-        self.swapShort = swapShort
-        self.swapType = swapType
-        self.symbol = symbol
-        self.timeString = timeString
-        self.trailingEnabled = trailingEnabled
-        self.type = type
-        self.exemode = exemode
-        
-        self.expiration: Optional[datetime.datetime] = expiration
-        self.starting: Optional[datetime.datetime] = starting
-        self.tickSize: Optional[float] = tickSize
-        self.tickValue: Optional[float] = tickValue
-        self.time: int = time
-    
-    
-@dataclass
+    ask: float                                       # Ask price in base currency
+    bid: float                                       # Bid price in base currency
+    categoryName: str                                # Category name
+    contractSize: int                                # Size of 1 lot
+    currency: str                                    # Currency
+    currencyPair: bool                               # Indicates whether the symbol represents a currency pair
+    currencyProfit: str                              # The currency of calculated profit
+    description: str                                 # Description
+    groupName: str                                   # Symbol group name
+    high: float                                      # The highest price of the day in base currency
+    initialMargin: int                               # Initial margin for 1 lot order used for profit/margin calculation
+    instantMaxVolume: int                            # Maximum instant volume multiplied by 100 (in lots)
+    leverage: float                                  # Symbol leverage
+    longOnly: bool                                   # Long only
+    lotMax: float                                    # Maximum size of trade
+    lotMin: float                                    # Minimum size of trade
+    lotStep: float                                   # A value of minimum step by which the size of trade can be changed (within lotMin - lotMax range)
+    low: float                                       # The lowest price of the day in base currency
+    marginHedged: int                                # Used for profit calculation
+    marginHedgedStrong: bool                         # For margin calculation
+    marginMaintenance: int                           # For margin calculation null if not applicable
+    marginMode: MarginMode                           # For margin calculation
+    percentage: float                                # Percentage
+    pipsPrecision: int                               # Number of symbol's pip decimal places
+    precision: int                                   # Number of symbol's price decimal places
+    profitMode: ProfitMode                           # For profit calculation
+    quoteId: QuoteId                                 # Source of price
+    quoteIdCross: int
+    shortSelling: bool                               # Indicates whether short selling is allowed on the instrument
+    spreadRaw: float                                 # The difference between raw ask and bid prices
+    spreadTable: float                               # Spread representation
+    stepRuleId: int                                  # Appropriate step rule ID from getStepRules  command response
+    stopsLevel: int                                  # Minimal distance (in pips) from the current price where the stopLoss/takeProfit can be set
+    swap_rollover3days: int                          # Time when additional swap is accounted for weekend
+    swapEnable: bool                                 # Indicates whether swap value is added to position on end of day
+    swapLong: float                                  # Swap value for long positions in pips
+    swapShort: float                                 # Swap value for short positions in pips
+    swapType: int                                    # Type of swap calculated
+    symbol: str                                      # Symbol name
+    timeString: str                                  # Time in string
+    trailingEnabled: bool                            # Indicates whether trailing stop (offset) is applicable to the instrument.
+    type: int                                        # Instrument class number
+    exemode: int                                     # Mode of execution
+
+    expiration: Optional[datetime.datetime] = None   # Null if not applicable
+    starting: Optional[datetime.datetime] = None     # Null if not applicable
+    tickSize: Optional[float] = None                 # Smallest possible price change, used for profit/margin calculation, null if not applicable
+    tickValue: Optional[float] = None                # Value of smallest possible price change (in base currency), used for profit/margin calculation, null if not applicable
+    time: int = None                                 # Ask & bid tick time. 13 long unixtime integer.
+
+
+@record
 class CalenderRecord:
     country: str                    # Two letter country code
     current: str                    # Market value (current), empty before time of release of this value (time from "time" record)
@@ -120,7 +96,7 @@ class CalenderRecord:
     time: datetime.datetime         # Time, when the information will be released (in this time empty "current" value should be changed with exact released value)
     title: str                      # Name of the indicator for which values will be released
     
-@dataclass
+@record
 class RateInfoRecord:
     close: float                        # Value of close price (shift from open price)
     ctm: int                            # Candle start time in CET / CEST time zone (see Daylight Saving Time, DST)
@@ -130,6 +106,11 @@ class RateInfoRecord:
     open: float                         # Open price (in base currency * 10 to the power of digits)
     vol: float                          # Volume in lots.
 
+@record
+class ChartRecord:
+    digits: int                         # Number of decimal places
+    rateInfos: list[RateInfoRecord]     # Array of RateInfoRecord
+
 # class RateInfoRecord:
 #     def __init__(self, close, ctm, ctmString, high, low, open, vol):
 #         self.close = close
@@ -140,7 +121,7 @@ class RateInfoRecord:
 #         self.open = open
 #         self.vol = vol
     
-@dataclass
+@record
 class IBRecord:
     closePrice: float	                # IB close price or null if not allowed to view
     login: str 	                        # IB user login or null if not allowed to view
@@ -153,7 +134,7 @@ class IBRecord:
     volume: float                       # Volume in lots or null if not allowed to view
     
 
-@dataclass
+@record
 class NewsTopicRecord:
     body: str                       # Body (typically some html body)
     bodylen: int                    # Body length
@@ -163,21 +144,21 @@ class NewsTopicRecord:
     title: str                      # News title
     
     
-@dataclass
+@record
 class StepRuleRecord:
     id: int                         # Step rule ID
     name: str                       # Step rule name
     steps: list[StepRecord]         # Array of StepRecord
     
     
-@dataclass
+@record
 class QuotesRecord:
     day: TradeDay                       # Day of week
     fromT: Optional[datetime.datetime]  # Start time in ms from 00:00 CET / CEST time zone (see Daylight Saving Time, DST)
     toT: Optional[datetime.datetime]    # End time in ms from 00:00 CET / CEST time zone (see Daylight Saving Time, DST)    
     
     
-@dataclass
+@record
 class TickRecord:
     ask: float                      # Ask price in base currency
     askVolume: int                  # Number of available lots to buy at given price or null if not applicable
@@ -193,7 +174,7 @@ class TickRecord:
     
     
     
-@dataclass
+@record
 class TradeRecord:
     close_price: float	            # Close price in base currency
     close_time: datetime.datetime   # Null if order is not closed
@@ -222,21 +203,21 @@ class TradeRecord:
     tp: float                       # Zero if take profit is not set (in base currency)
     volume: float                   # Volume in lots
 
-@dataclass
+@record
 class TradingRecord:
     day: TradeDay               # Day of week
     fromT: datetime.datetime    # Start time in ms from 00:00 CET / CEST time zone (see Daylight Saving Time, DST)
     toT: datetime.datetime      # End time in ms from 00:00 CET / CEST time zone (see Daylight Saving Time, DST)
 
     
-@dataclass
+@record
 class TradeHoursRecord:
     quotes: list[QuotesRecord]      # Array of QuotesRecord
     symbol: str                     # Symbol
     trading: list[TradingRecord]    # Array of TradingRecord
     
 
-@dataclass
+@record
 class StreamingBalanceRecord:
     balance: float          # balance in account currency
     credit: float           # credit in account currency
@@ -246,7 +227,7 @@ class StreamingBalanceRecord:
     marginLevel: float      # margin level percentage
 
 
-@dataclass
+@record
 class StreamingCandleRecord:
     close: float                        # Close price in base currency
     ctm: Optional[datetime.datetime]    # Candle start time in CET time zone (Central European Time)
@@ -259,12 +240,12 @@ class StreamingCandleRecord:
     vol: float                          # Volume in lots.
     
     
-@dataclass
+@record
 class StreamingKeepAliveRecord:
     timestamp: int              # Current timestamp
     
 
-@dataclass
+@record
 class StreamingNewsRecord:
     body: str                       # Body (typically some html body)
     key: str                        # News key
@@ -272,14 +253,14 @@ class StreamingNewsRecord:
     title: str                      # News title
     
 
-@dataclass
+@record
 class StreamingProfitRecord:
     order: int      # Order number
     order2: int     # Transaction ID
     position: int   # Position number
     profit: float   # Profit in account currency
     
-@dataclass
+@record
 class StreamTickRecord:
     ask: float                      # Ask price in base currency
     askVolume: int                  # Number of available lots to buy at given price or null if not applicable
@@ -295,7 +276,7 @@ class StreamTickRecord:
     timestamp: datetime.datetime    # Timestamp
     
     
-@dataclass
+@record
 class StreamingTradeRecord:
     close_price: float	            # Close price in base currency
     close_time: datetime.datetime   # Null if order is not closed
@@ -323,7 +304,7 @@ class StreamingTradeRecord:
     volume: float                   # Volume in lots
     
     
-@dataclass
+@record
 class StreamingTradeStatusRecord:
     customComment: str          # The value the customer may provide in order to retrieve it later.
     message: str                # Can be null
@@ -179,12 +179,12 @@ class Socket(Connection):
             }
         })
 
-    async def getServerTime(self):
-        """Returns current time on trading server."""
+    async def getServerTime(self, timing: list = None):
+        """Returns current time on trading server. A `timing` list receives the (sent, received) times, see `Connection._transaction`."""
         
         return await self._transaction({
             "command": "getServerTime"
-        })
+        }, timing)
 
     async def getStepRules(self):
         """Returns a list of step rules for DMAs."""
@@ -258,7 +258,7 @@ class Socket(Connection):
             }
         })
         response = response.get('returnData')[0]
-        return TradeHoursRecord(**response)
+        return TradeHoursRecord.from_dict(response)
 
     async def getVersion(self):
         """Returns the current API version."""
@@ -267,16 +267,17 @@ class Socket(Connection):
             "command": "getVersion"
         })
 
-    async def ping(self):
+    async def ping(self, timing: list = None):
         """
         Regularly calling this function is enough to refresh the internal state of all the components in the system.
         It is recommended that any application that does not execute other commands, should call this command at least once every 10 minutes.
         Please note that the streaming counterpart of this function is combination of 'ping' and 'getKeepAlive'.
+        A `timing` list receives the (sent, received) times, see `Connection._transaction`.
         """
         
         return await self._transaction({
             "command": "ping"
-        })
+        }, timing)
 
     async def tradeTransaction(self, symbol: str, cmd: TradeCmd, type: TradeType, price: float, volume: float,
                                sl: float = 0, tp: float = 0, order: int = 0, expiration: int = 0,
@@ -0,0 +1,256 @@
+from .enums import PeriodCode
+from .columnar import ChartColumns, concatenate
+
+from typing import Dict, Iterable, List, Optional
+import json
+import os
+
+import numpy as np
+
+"""
+
+Partitioned columnar store of chart history.
+
+Candles are stored per symbol, period and calendar month (UTC) with one .npy file per column:
+
+    <root>/GBPJPY/PERIOD_M15/2023-05/ctm.npy, open.npy, high.npy, low.npy, close.npy, vol.npy
+    <root>/manifest.json
+
+The manifest indexes every partition with its row count, first and last `ctm` and `digits`, so a read only opens the
+partitions overlapping the requested time range and only the requested columns of those, loading one month of one
+symbol never touches the rest of the store. Within a partition rows are sorted by `ctm` without duplicates.
+
+For backtests over many months `open()` returns a MappedSeries: the partitions of a symbol are compacted once into one
+contiguous .npy file per column under <root>/<symbol>/<PERIOD>/series/, which is then memory-mapped read-only. Opening
+only reads the file headers, a time range is a binary search on `ctm` returning views, and every process mapping the
+same series shares the operating system page cache instead of holding a private copy. Writing to a symbol marks its
+series stale and the next `open()` compacts it again.
+
+    store = ColumnStore(os.path.join("algotrading", "backtest_data", "store"))
+    store.write("GBPJPY", PeriodCode.PERIOD_M15, columns)
+    closes = store.read("GBPJPY", PeriodCode.PERIOD_M15, start, end, columns=("close",))
+    candles = store.open("GBPJPY", PeriodCode.PERIOD_M1).between(start, end)
+
+"""
+
+COLUMNS = ("ctm", "open", "high", "low", "close", "vol")
+DTYPES = {"ctm": np.int64, "open": np.int64, "high": np.int64, "low": np.int64, "close": np.int64, "vol": np.float64}
+MANIFEST = "manifest.json"
+SERIES = "series"
+
+
+def month_of(ctm: np.ndarray) -> np.ndarray:
+    """Returns the UTC calendar month ('YYYY-MM') of millisecond times."""
+    return ctm.astype("datetime64[ms]").astype("datetime64[M]").astype(str)
+
+
+class ColumnStore:
+    """Chart candles partitioned by symbol/period/month as .npy column files under `root`."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.manifest: Dict[str, dict] = {}             # Partition key to rows, first, last and digits
+        self.series: Dict[str, dict] = {}               # "<symbol>/<PERIOD>" to rows, first, last and digits of its compacted series
+        self._load_manifest()
+
+    def _load_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as file:
+                manifest = json.load(file)
+            self.manifest = manifest["partitions"]
+            self.series = manifest.get("series", {})
+
+    def _save_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w") as file:
+            json.dump({"version": 1, "partitions": self.manifest, "series": self.series}, file, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def key(symbol: str, period: PeriodCode, month: str) -> str:
+        """Manifest key of a partition, also its directory relative to the root ('/' separated)."""
+        return f"{symbol}/{PeriodCode(period).name}/{month}"
+
+    def directory(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def partitions(self, symbol: str, period: PeriodCode, start: int = None, end: int = None) -> List[str]:
+        """Returns the keys of the partitions of `symbol` holding candles in [start, end), oldest first."""
+
+        prefix = f"{symbol}/{PeriodCode(period).name}/"
+        return sorted(
+            key for key, entry in self.manifest.items()
+            if key.startswith(prefix)
+            and (start is None or entry["last"] >= start)
+            and (end is None or entry["first"] < end)
+        )
+
+    def last_ctm(self, symbol: str, period: PeriodCode) -> Optional[int]:
+        """Returns the newest stored candle time of `symbol`, None if nothing is stored."""
+
+        keys = self.partitions(symbol, period)
+        return self.manifest[keys[-1]]["last"] if keys else None
+
+    def size(self, symbol: str, period: PeriodCode) -> int:
+        """Returns the bytes stored for `symbol` at `period`."""
+
+        return sum(
+            os.path.getsize(os.path.join(self.directory(key), f"{column}.npy"))
+            for key in self.partitions(symbol, period) for column in COLUMNS
+        )
+
+    def _read_partition(self, key: str, columns: Iterable[str], start: int = None, end: int = None) -> Dict[str, np.ndarray]:
+        directory = self.directory(key)
+        entry = self.manifest[key]
+
+        # Rows are sorted by ctm, so a range inside the partition is one slice found by binary search.
+        lower, upper = 0, entry["rows"]
+        if (start is not None and start > entry["first"]) or (end is not None and end <= entry["last"]):
+            ctm = np.load(os.path.join(directory, "ctm.npy"), mmap_mode="r")
+            lower = 0 if start is None else int(np.searchsorted(ctm, start, "left"))
+            upper = entry["rows"] if end is None else int(np.searchsorted(ctm, end, "left"))
+
+        return {column: np.load(os.path.join(directory, f"{column}.npy"))[lower:upper] for column in columns}
+
+    def read(self, symbol: str, period: PeriodCode, start: int = None, end: int = None,
+             columns: Iterable[str] = COLUMNS) -> Dict[str, np.ndarray]:
+        """Returns the requested columns of the candles of `symbol` in [start, end) (milliseconds), oldest first."""
+
+        columns = tuple(columns)
+        parts = [self._read_partition(key, columns, start, end) for key in self.partitions(symbol, period, start, end)]
+        if not parts:
+            return {column: np.empty(0, DTYPES[column]) for column in columns}
+        return {column: np.concatenate([part[column] for part in parts]) for column in columns}
+
+    def read_chart(self, symbol: str, period: PeriodCode, start: int = None, end: int = None) -> ChartColumns:
+        """Returns the candles of `symbol` in [start, end) as ChartColumns."""
+
+        keys = self.partitions(symbol, period, start, end)
+        digits = self.manifest[keys[-1]]["digits"] if keys else 0
+        return ChartColumns(digits, **self.read(symbol, period, start, end))
+
+    def write(self, symbol: str, period: PeriodCode, columns: ChartColumns):
+        """
+        Merges candles into the partitions of their months, candles replace stored ones with the same ctm (e.g. a
+        candle that was still forming when stored). Only the months present in `columns` are rewritten.
+        """
+
+        if not len(columns):
+            return
+
+        months = month_of(columns.ctm)
+        for month in np.unique(months):
+            key = self.key(symbol, period, str(month))
+            new = columns.take(months == month)
+            if key in self.manifest:
+                stored = ChartColumns(self.manifest[key]["digits"], **self._read_partition(key, COLUMNS))
+                new = concatenate([new, stored])
+            self._write_partition(key, new)
+
+        self.series.pop(f"{symbol}/{PeriodCode(period).name}", None)
+        self._save_manifest()
+
+    def _write_partition(self, key: str, columns: ChartColumns):
+        directory = self.directory(key)
+        os.makedirs(directory, exist_ok=True)
+        for column in COLUMNS:
+            path = os.path.join(directory, f"{column}.npy")
+            with open(path + ".tmp", "wb") as file:
+                np.save(file, np.ascontiguousarray(getattr(columns, column)))
+            os.replace(path + ".tmp", path)
+
+        self.manifest[key] = {
+            "rows": len(columns),
+            "first": int(columns.ctm[0]),
+            "last": int(columns.ctm[-1]),
+            "digits": columns.digits,
+        }
+
+    def delete(self, symbol: str, period: PeriodCode):
+        """Removes every partition of `symbol` at `period`."""
+
+        for key in self.partitions(symbol, period):
+            directory = self.directory(key)
+            for column in COLUMNS:
+                path = os.path.join(directory, f"{column}.npy")
+                if os.path.exists(path):
+                    os.remove(path)
+            os.rmdir(directory)
+            del self.manifest[key]
+        self.series.pop(f"{symbol}/{PeriodCode(period).name}", None)
+        self._save_manifest()
+
+    def compact(self, symbol: str, period: PeriodCode):
+        """Writes the partitions of `symbol` into one contiguous .npy file per column, the series that `open()` maps."""
+
+        name = f"{symbol}/{PeriodCode(period).name}"
+        keys = self.partitions(symbol, period)
+        rows = sum(self.manifest[key]["rows"] for key in keys)
+        directory = self.directory(f"{name}/{SERIES}")
+        os.makedirs(directory, exist_ok=True)
+
+        # Filled partition by partition, so compacting never holds more than one month in memory.
+        for column in COLUMNS:
+            path = os.path.join(directory, f"{column}.npy")
+            target = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=DTYPES[column], shape=(rows,))
+            offset = 0
+            for key in keys:
+                values = np.load(os.path.join(self.directory(key), f"{column}.npy"))
+                target[offset:offset + len(values)] = values
+                offset += len(values)
+            target.flush()
+            del target
+            os.replace(path + ".tmp", path)
+
+        self.series[name] = {
+            "rows": rows,
+            "first": self.manifest[keys[0]]["first"] if keys else None,
+            "last": self.manifest[keys[-1]]["last"] if keys else None,
+            "digits": self.manifest[keys[-1]]["digits"] if keys else 0,
+        }
+        self._save_manifest()
+
+    def open(self, symbol: str, period: PeriodCode) -> "MappedSeries":
+        """Returns the memory-mapped series of `symbol`, compacting it first if it is missing or stale."""
+
+        name = f"{symbol}/{PeriodCode(period).name}"
+        if name not in self.series:
+            self.compact(symbol, period)
+        return MappedSeries(self.directory(f"{name}/{SERIES}"), self.series[name]["digits"])
+
+
+class MappedSeries:
+    """Read-only memory-mapped candle columns of one symbol and period, sorted by `ctm`."""
+
+    def __init__(self, directory: str, digits: int):
+        self.directory = directory
+        self.digits = digits
+        for column in COLUMNS:
+            setattr(self, column, np.load(os.path.join(directory, f"{column}.npy"), mmap_mode="r"))
+
+    def __len__(self) -> int:
+        return len(self.ctm)
+
+    def index(self, ctm: int, side: str = "left") -> int:
+        """Returns the row of the first candle at or after `ctm` (binary search, touches O(log n) pages)."""
+        return int(np.searchsorted(self.ctm, ctm, side))
+
+    def between(self, start: int = None, end: int = None) -> ChartColumns:
+        """Returns the candles in [start, end) as ChartColumns of views into the mapped files, nothing is copied."""
+
+        lower = 0 if start is None else self.index(start)
+        upper = len(self) if end is None else self.index(end)
+        return ChartColumns(self.digits, *(getattr(self, column)[lower:upper] for column in COLUMNS))
+
+
+def read_rate_info_csv(path: str, digits: int) -> ChartColumns:
+    """Reads a backtest CSV file written from RateInfoRecords (ctmString, ctm, open, high, low, close, vol)."""
+
+    table = np.loadtxt(path, delimiter=",", skiprows=1, usecols=(1, 2, 3, 4, 5, 6), quotechar='"', ndmin=2)
+    ctm = table[:, 0].astype(np.int64)
+    open = np.rint(table[:, 1]).astype(np.int64)
+    shifts = np.rint(table[:, 2:5]).astype(np.int64)
+    return concatenate([ChartColumns(digits, ctm, open, open + shifts[:, 0], open + shifts[:, 1], open + shifts[:, 2],
+                                     np.ascontiguousarray(table[:, 5]))], digits)
@@ -1,143 +1,191 @@
 from .connection import Connection
+from .ratelimit import RateLimiter
+from .codec import Codec
+from .dispatcher import StreamDispatcher, Subscription
+
+from typing import Callable
 
 
 class Stream(Connection):
+    channel = 1
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, limiter: RateLimiter = None, codec: Codec = None):
+        super().__init__(limiter=limiter, codec=codec)
         self.streamSessionId = str()
+        self.dispatcher = StreamDispatcher(self)
+
+        # Subscription commands currently in effect, keyed by (command, symbol), replayed after a reconnect.
+        self.subscriptions = {}
+
+    async def _request(self, command):
+        sent = await super()._request(command)
+
+        name = command.get("command", "")
+        if name.startswith("get"):
+            self.subscriptions[(name, command.get("symbol"))] = command
+        elif name.startswith("stop"):
+            self.subscriptions.pop(("get" + name[4:], command.get("symbol")), None)
+        return sent
 
-    async def getBalance(self):
+    async def resubscribe(self):
+        """Re-issues every active subscription with the current streamSessionId, e.g. after logging in again."""
+
+        for key, command in list(self.subscriptions.items()):
+            await self._request({**command, "streamSessionId": self.streamSessionId})
+
+    async def getBalance(self) -> Subscription:
         """Allows to get actual account indicators values in real-time, as soon as they are available in the system."""
         
-        return await self._request({
+        await self._request({
             "command": "getBalance",
             "streamSessionId": self.streamSessionId
         })
+        return self.dispatcher.subscribe("balance")
 
     async def stopBalance(self):
         """Unsubscribe from balance requests. """
         
+        self.dispatcher.unsubscribe("balance")
         return await self._request({
             "command": "stopBalance"
         })
 
-    async def getCandles(self, symbol: str):
-        """Subscribes for API chart candles. The interval of every candle is 1 minute. A new candle arrives every minute."""
+    async def getCandles(self, symbol: str, callback: Callable = None) -> Subscription:
+        """
+        Subscribes for API chart candles. The interval of every candle is 1 minute. A new candle arrives every minute.
+        Returns a Subscription yielding the candle data of this symbol, or passing it to `callback` when given.
+        """
         
-        return await self._request({
+        await self._request({
             "command": "getCandles",
             "streamSessionId": self.streamSessionId,
             "symbol": symbol
         })
+        return self.dispatcher.subscribe("candle", symbol, callback=callback)
 
     async def stopCandles(self, symbol: str):
         """Unsubscribe from candle requests. """
         
+        self.dispatcher.unsubscribe("candle", symbol)
         return await self._request({
             "command": "stopCandles",
             "symbol": symbol
         })
 
-    async def getKeepAlive(self):
+    async def getKeepAlive(self, callback: Callable = None) -> Subscription:
         """Subscribes for 'keep alive' messages. A new 'keep alive' message is sent by the API every 3 seconds."""
         
-        return await self._request({
+        await self._request({
             "command": "getKeepAlive",
             "streamSessionId": self.streamSessionId
         })
+        return self.dispatcher.subscribe("keepAlive", callback=callback)
 
     async def stopKeepAlive(self):
         """Unsubscribe from keepAlive requests."""
+        self.dispatcher.unsubscribe("keepAlive")
         return await self._request({
             "command": "stopKeepAlive"
         })
 
-    async def getNews(self):
+    async def getNews(self) -> Subscription:
         """Subscribes for news requests."""
         
-        return await self._request({
+        await self._request({
             "command": "getNews",
             "streamSessionId": self.streamSessionId
         })
+        return self.dispatcher.subscribe("news")
 
     async def stopNews(self):
         """Unsubscribe from news requests. """
         
+        self.dispatcher.unsubscribe("news")
         return await self._request({
             "command": "stopNews"
         }
         )
 
-    async def getProfits(self):
+    async def getProfits(self) -> Subscription:
         """Subscibes for profit requests. """
         
-        return await self._request({
+        await self._request({
             "command": "getProfits",
             "streamSessionId": self.streamSessionId
         })
+        return self.dispatcher.subscribe("profit")
 
     async def stopProfits(self):
         """Unsubscribes from profit requests. """
         
+        self.dispatcher.unsubscribe("profit")
         return await self._request({
             "command": "stopProfits"
         })
 
-    async def getTickPrices(self, symbol: str, minArrivalTime: int = 0, maxLevel: int = 2):
+    async def getTickPrices(self, symbol: str, minArrivalTime: int = 0, maxLevel: int = 2, callback: Callable = None,
+                            conflate: bool = False) -> Subscription:
         """
         Establishes subscription for quotations and allows to obtain the relevant information in real-time, as soon as it is available in the system.
         The getTickPrices  command can be invoked many times for the same symbol, but only one subscription for a given symbol will be created.
         Please beware that when multiple records are available, the order in which they are received is not guaranteed.
+        Returns a Subscription yielding the tick data of this symbol, or passing it to `callback` when given.
+        With `conflate` only the newest StreamTickRecord per price level is kept until consumed, see `ConflatingSubscription`.
         """
         
-        return await self._request({
+        await self._request({
             "command": "getTickPrices",
             "streamSessionId": self.streamSessionId,
             "symbol": symbol,
             "minArrivalTime": minArrivalTime,
             "maxLevel": maxLevel
         })
+        return self.dispatcher.subscribe("tickPrices", symbol, callback=callback, conflate=conflate)
 
     async def stopTickPrices(self, symbol: str):
         """Unsubscribe from tick price requests. """
         
+        self.dispatcher.unsubscribe("tickPrices", symbol)
         return await self._request({
             "command": "stopTickPrices",
             "symbol": symbol
         })
 
-    async def getTrades(self):
+    async def getTrades(self) -> Subscription:
         """
         Establishes subscription for user trade status data and allows to obtain the relevant information in real-time, as soon as it is available in the system.
         Please beware that when multiple records are available, the order in which they are received is not guaranteed."""
         
-        return await self._request({
+        await self._request({
             "command": "getTrades",
             "streamSessionId": self.streamSessionId
         })
+        return self.dispatcher.subscribe("trade")
 
     async def stopTrades(self):
         """Unsubscribes from trade requests. """
         
+        self.dispatcher.unsubscribe("trade")
         return await self._request({
             "command": "stopTrades"
         })
 
-    async def getTradeStatus(self):
+    async def getTradeStatus(self) -> Subscription:
         """
         Allows to get status for sent trade requests in real-time, as soon as it is available in the system.
         Please beware that when multiple records are available, the order in which they are received is not guaranteed.
         """
         
-        return await self._request({
+        await self._request({
             "command": "getTradeStatus",
             "streamSessionId": self.streamSessionId
         })
+        return self.dispatcher.subscribe("tradeStatus")
 
     async def stopTradeStatus(self):
         """Unsubscribe from trade status requests. """
         
+        self.dispatcher.unsubscribe("tradeStatus")
         return await self._request({
             "command": "stopTradeStatus"
         })
@@ -0,0 +1,117 @@
+from .records import SymbolRecord
+
+from typing import Dict, Optional
+import dataclasses
+import json
+import logging
+import os
+import time
+
+"""
+
+Symbol metadata cache.
+
+Most of a SymbolRecord is static for days (contractSize, lotStep, precision, tickSize...), only the quote fields change
+with every tick. A SymbolCache keeps the records in memory and the getAllSymbols records as a JSON snapshot on
+disk, so a new process starts from the snapshot without a request per symbol. The snapshot is requested again once it
+is older than `ttl` seconds.
+
+The quote fields of the snapshot are as old as the snapshot, so `get` does not serve them from it. Symbols whose ticks
+are fed to `on_tick` get them from the newest tick, kept as a small tuple per symbol and merged into the record when it
+is read, any other symbol gets them from a getSymbol request. With `quotes=False` only the static fields are needed
+and the snapshot record is returned as it is.
+
+    symbols = SymbolCache(os.path.join("algotrading", "backtest_data", "symbols.json"))
+    record = await symbols.get(connector.socket, "GBPJPY")
+    await connector.stream.getTickPrices("GBPJPY", callback=symbols.on_tick)
+
+"""
+
+QUOTE_FIELDS = ("ask", "bid", "high", "low", "spreadRaw", "spreadTable", "time")
+
+
+class SymbolCache:
+    """SymbolRecords by symbol, in memory and as a getAllSymbols snapshot at `path`."""
+
+    def __init__(self, path: str, ttl: float = 86400.0, logger: logging.Logger = None):
+        self.path = path
+        self.ttl = ttl
+        self.records: Dict[str, SymbolRecord] = {}
+        self.quotes: Dict[str, tuple] = {}          # QUOTE_FIELDS of the newest tick per symbol fed to `on_tick`
+        self.fetched: Optional[float] = None        # Time in milliseconds the snapshot was requested
+        self.requests = 0                           # getAllSymbols and getSymbol requests sent
+        self.logger = logger or logging.getLogger("xapi.symbols")
+        self.load()
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.records
+
+    def __getitem__(self, symbol: str) -> SymbolRecord:
+        return self.records[symbol]
+
+    def load(self) -> bool:
+        """Loads the snapshot from disk, returns False if there is none."""
+
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as file:
+            snapshot = json.load(file)
+        self.fetched = snapshot["fetched"]
+        self.records = {data["symbol"]: SymbolRecord.from_dict(data) for data in snapshot["symbols"]}
+        return True
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        snapshot = {"fetched": self.fetched, "symbols": [dataclasses.asdict(record) for record in self.records.values()]}
+        with open(self.path + ".tmp", "w") as file:
+            json.dump(snapshot, file)
+        os.replace(self.path + ".tmp", self.path)
+
+    def is_stale(self, now: float = None) -> bool:
+        now = time.time() * 1000 if now is None else now
+        return self.fetched is None or now - self.fetched > self.ttl * 1000
+
+    async def refresh(self, socket, now: float = None):
+        """Replaces every record with one getAllSymbols request and saves the snapshot."""
+
+        response = await socket.getAllSymbols()
+        self.requests += 1
+        self.fetched = time.time() * 1000 if now is None else now
+        self.records = {data["symbol"]: SymbolRecord.from_dict(data) for data in response.get("returnData") or []}
+        self.save()
+        self.logger.info(f"Symbol cache refreshed, {len(self.records)} symbols")
+
+    async def get(self, socket, symbol: str, now: float = None, quotes: bool = True) -> SymbolRecord:
+        """
+        Returns the SymbolRecord of `symbol`. The static fields come from the snapshot, requested again only if it is
+        older than `ttl`. With `quotes` the quote fields come from the newest streamed tick, or from a getSymbol request
+        if no ticks of `symbol` are fed to the cache, otherwise they are those of the snapshot.
+        """
+
+        if self.is_stale(now):
+            await self.refresh(socket, now)
+        record = self.records.get(symbol)
+        if record is None or (quotes and symbol not in self.quotes):
+            response = await socket.getSymbol(symbol)
+            self.requests += 1
+            fresh = SymbolRecord.from_dict(response["returnData"])
+            if record is None:
+                self.records[symbol] = fresh
+                self.save()
+            return fresh
+        if quotes:
+            quote = {field: value for field, value in zip(QUOTE_FIELDS, self.quotes[symbol]) if value is not None}
+            return dataclasses.replace(record, **quote)
+        return record
+
+    def on_tick(self, tick):
+        """Stream callback keeping the quote fields of a tick (data dict or StreamTickRecord) for its symbol."""
+
+        if isinstance(tick, dict):
+            if tick.get("level", 0) == 0:
+                self.quotes[tick["symbol"]] = (tick.get("ask"), tick.get("bid"), tick.get("high"), tick.get("low"),
+                                               tick.get("spreadRaw"), tick.get("spreadTable"), tick.get("timestamp"))
+        elif tick.level == 0:
+            self.quotes[tick.symbol] = (tick.ask, tick.bid, tick.high, tick.low, tick.spreadRaw, tick.spreadTable, tick.timestamp)
@@ -0,0 +1,128 @@
+from operator import attrgetter, itemgetter
+from typing import Dict
+
+import numpy as np
+
+"""
+
+Preallocated ring buffers of streamed ticks.
+
+Each symbol gets a fixed capacity structured array of (timestamp, bid, ask, bidVolume, askVolume, spreadRaw) that tick
+messages are copied into without allocating. Every tick is written twice, at `index` and `index + capacity` of a
+buffer twice the capacity, so the last N ticks are always one contiguous slice and `last(n)` returns a view instead of
+a copy, even across the wrap around.
+
+With `digits` the prices (bid, ask, spreadRaw) are stored as int64 points of 10 ** -digits instead of floats, so spread
+checks and price comparisons on the buffer are exact integer operations (see `points`).
+
+There is no lock: ticks are written by the dispatcher task and the write position only moves after a row is complete,
+so a reader on the event loop always sees whole ticks. Views alias the buffer, they are only stable until `capacity`
+more ticks arrived; copy them to keep them longer.
+
+    store = TickStore(capacity=10000)
+    await connector.stream.getTickPrices("GBPJPY", callback=store.on_tick)
+    spreads = store["GBPJPY"].column("spreadRaw", 500)
+
+"""
+
+TICK_DTYPE = np.dtype([
+    ("timestamp", np.int64),        # Tick time in milliseconds
+    ("bid", np.float64),            # Bid price in base currency
+    ("ask", np.float64),            # Ask price in base currency
+    ("bidVolume", np.int64),        # Lots available at the bid, 0 if not applicable
+    ("askVolume", np.int64),        # Lots available at the ask, 0 if not applicable
+    ("spreadRaw", np.float64),      # The difference between raw ask and bid prices
+])
+
+POINTS_TICK_DTYPE = np.dtype([
+    ("timestamp", np.int64),
+    ("bid", np.int64),              # Bid price in points
+    ("ask", np.int64),              # Ask price in points
+    ("bidVolume", np.int64),
+    ("askVolume", np.int64),
+    ("spreadRaw", np.int64),        # Ask minus bid in points
+])
+
+_ITEMS = itemgetter(*TICK_DTYPE.names)
+_ATTRS = attrgetter(*TICK_DTYPE.names)
+
+
+class TickRingBuffer:
+    """Fixed capacity buffer of the newest ticks of one symbol."""
+
+    __slots__ = ("symbol", "capacity", "digits", "count", "_scale", "_data")
+
+    def __init__(self, capacity: int = 10000, symbol: str = None, digits: int = None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.symbol = symbol
+        self.capacity = capacity
+        self.digits = digits                                    # Prices are stored as integer points if set
+        self.count = 0                                          # Ticks written since creation
+        self._scale = None if digits is None else 10 ** digits
+        self._data = np.zeros(2 * capacity, dtype=TICK_DTYPE if digits is None else POINTS_TICK_DTYPE)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, tick):
+        """Copies a tick data dict or StreamTickRecord into the buffer."""
+
+        values = _ITEMS(tick) if isinstance(tick, dict) else _ATTRS(tick)
+        if None in values:
+            values = tuple(0 if value is None else value for value in values)
+        if self._scale is not None:
+            timestamp, bid, ask, bid_volume, ask_volume, _ = values
+            bid, ask = round(bid * self._scale), round(ask * self._scale)
+            values = (timestamp, bid, ask, bid_volume, ask_volume, ask - bid)
+
+        index = self.count % self.capacity
+        self._data[index] = values
+        self._data[index + self.capacity] = values
+        self.count += 1
+
+    def last(self, n: int = None) -> np.ndarray:
+        """Returns a read-only view of the newest `n` ticks (all buffered ticks if `None`), oldest first."""
+
+        n = len(self) if n is None else min(n, len(self))
+        end = (self.count - 1) % self.capacity + self.capacity + 1 if self.count else self.capacity
+        view = self._data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def column(self, name: str, n: int = None) -> np.ndarray:
+        """Returns a read-only view of one field of the newest `n` ticks, e.g. `column("bid", 100)`."""
+        return self.last(n)[name]
+
+    def latest(self):
+        """Returns the newest tick as a structured scalar, or None if empty."""
+        return self.last(1)[0] if self.count else None
+
+
+class TickStore:
+    """Ring buffers per symbol, created on the first tick of a symbol."""
+
+    def __init__(self, capacity: int = 10000, levels: tuple = (0,), digits: Dict[str, int] = None):
+        self.capacity = capacity
+        self.levels = levels                                    # Price levels to keep, market depth levels are skipped
+        self.digits = digits if digits is not None else {}      # Symbols whose prices are stored as integer points
+        self.buffers: Dict[str, TickRingBuffer] = {}
+
+    def __getitem__(self, symbol: str) -> TickRingBuffer:
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            buffer = self.buffers[symbol] = TickRingBuffer(self.capacity, symbol, self.digits.get(symbol))
+        return buffer
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.buffers
+
+    def on_tick(self, tick):
+        """Stream callback storing a tick data dict or StreamTickRecord in the buffer of its symbol."""
+
+        if isinstance(tick, dict):
+            symbol, level = tick.get("symbol"), tick.get("level", 0)
+        else:
+            symbol, level = tick.symbol, tick.level
+        if level in self.levels:
+            self[symbol].append(tick)
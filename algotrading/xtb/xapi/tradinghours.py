@@ -0,0 +1,102 @@
+from .clock import CET
+from .enums import TradeDay
+from .records import TradingRecord
+
+from typing import Dict, List, Optional, Tuple
+import bisect
+import datetime
+import logging
+import time
+
+"""
+
+Cached trading hours.
+
+getTradingHours returns the sessions of a symbol as TradingRecords of (day, fromT, toT), in milliseconds from 00:00
+CET / CEST. A TradingCalendar requests them once per symbol and CET day and compiles them into a table per weekday of
+sorted, merged session bounds, so whether a symbol is open (or in the last hour of its session, when rollover fees are
+charged) is a lookup in memory instead of broker round-trips.
+
+    calendar = TradingCalendar()
+    hours = await calendar.get(connector.socket, "GBPJPY")
+    hours.is_open(time.time() * 1000)
+
+"""
+
+DAY_MS = 86400000
+HOUR_MS = 3600000
+
+
+def cet_time(when: float) -> Tuple[int, int]:
+    """Returns the (TradeDay, milliseconds from 00:00) of a millisecond time in CET / CEST."""
+
+    local = datetime.datetime.fromtimestamp(when / 1000, CET)
+    return local.isoweekday(), (local.hour * 3600 + local.minute * 60 + local.second) * 1000 + local.microsecond // 1000
+
+
+class TradingHours:
+    """The trading sessions of one symbol as sorted, non-overlapping (fromT, toT) bounds per weekday."""
+
+    def __init__(self, symbol: str, trading: List[TradingRecord], fetched: float = 0.0):
+        self.symbol = symbol
+        self.fetched = fetched          # Time in milliseconds the hours were requested
+        self.starts: Dict[int, List[int]] = {day: [] for day in TradeDay}
+        self.ends: Dict[int, List[int]] = {day: [] for day in TradeDay}
+
+        for day in TradeDay:
+            sessions = sorted((record.fromT, record.toT) for record in trading if record.day == day)
+            for start, end in sessions:
+                if self.ends[day] and start <= self.ends[day][-1]:
+                    self.ends[day][-1] = max(self.ends[day][-1], end)
+                else:
+                    self.starts[day].append(start)
+                    self.ends[day].append(end)
+
+    def session(self, when: float) -> Optional[Tuple[int, int]]:
+        """Returns the (fromT, toT) of the session open at the millisecond time `when`, None if the market is closed."""
+
+        day, ms = cet_time(when)
+        index = bisect.bisect_right(self.starts[day], ms) - 1
+        if index >= 0 and ms < self.ends[day][index]:
+            return self.starts[day][index], self.ends[day][index]
+        return None
+
+    def is_open(self, when: float) -> bool:
+        return self.session(when) is not None
+
+    def is_rollover(self, when: float) -> bool:
+        """Returns True in the last hour of the session open at `when`, before rollover fees are charged at its end."""
+
+        session = self.session(when)
+        return session is not None and cet_time(when)[1] // HOUR_MS == session[1] // HOUR_MS - 1
+
+
+class TradingCalendar:
+    """TradingHours per symbol, requested again once the CET day they were requested on has passed."""
+
+    def __init__(self, logger: logging.Logger = None):
+        self.hours: Dict[str, TradingHours] = {}
+        self.logger = logger or logging.getLogger("xapi.tradinghours")
+
+    def is_stale(self, symbol: str, now: float) -> bool:
+        hours = self.hours.get(symbol)
+        if hours is None:
+            return True
+        fetched = datetime.datetime.fromtimestamp(hours.fetched / 1000, CET).date()
+        return datetime.datetime.fromtimestamp(now / 1000, CET).date() != fetched
+
+    async def get(self, socket, symbol: str, now: float = None) -> TradingHours:
+        """Returns the TradingHours of `symbol`, requesting them from `socket` at most once per CET day."""
+
+        now = time.time() * 1000 if now is None else now
+        if self.is_stale(symbol, now):
+            await self.refresh(socket, symbol, now)
+        return self.hours[symbol]
+
+    async def refresh(self, socket, symbol: str, now: float = None) -> TradingHours:
+        now = time.time() * 1000 if now is None else now
+        response = await socket.getTradingHours([symbol])
+        trading = [TradingRecord.from_dict(session) for session in response.trading]
+        self.hours[symbol] = TradingHours(symbol, trading, now)
+        self.logger.debug(f"Trading hours of {symbol} refreshed, {len(trading)} sessions")
+        return self.hours[symbol]
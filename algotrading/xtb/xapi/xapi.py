@@ -1,11 +1,56 @@
 from .socket import Socket
 from .stream import Stream
-from .exceptions import LoginFailed
+from .exceptions import LoginFailed, ConnectionClosed
+from .ratelimit import RateLimiter
+from .codec import Codec
+from .heartbeat import Heartbeat
+from .clock import ServerClock
+from .metrics import log_metrics
+
+from dataclasses import dataclass
+from typing import List, Optional
+import functools
+import inspect
+import asyncio
+import logging
+import time
+
+# XTB allows a limited number of concurrent connections per account, keep pools well below it.
+MAX_POOL_SESSIONS = 10
+
+@dataclass
+class ReconnectRecord:
+    started: float              # time.time() when the reconnect started
+    duration: float             # Seconds until the session and subscriptions were restored
+    attempts: int               # Number of connection attempts
+    gap: Optional[float]        # Seconds between the last stream message before the drop and the restored session
+    reason: str                 # The error that caused the reconnect
+
 
 class XAPI:
-    def __init__(self):
-        self.socket = Socket()
-        self.stream = Stream()
+    def __init__(self, multiplexed: bool = False, limiter: RateLimiter = None, codec: Codec = None, auto_reconnect: bool = False):
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.socket = Socket(multiplexed=multiplexed, limiter=self.limiter, codec=codec)
+        self.stream = Stream(limiter=self.limiter, codec=codec)
+        self.logger = logging.getLogger(__class__.__name__)
+
+        # Exponential backoff between reconnect attempts, in seconds.
+        self.backoff_initial = 0.1
+        self.backoff_max = 30.0
+        self.max_attempts = None
+
+        self.closed = False
+        self.auto_reconnect = auto_reconnect
+        self.reconnects: List[ReconnectRecord] = []
+        self.heartbeat: Optional[Heartbeat] = None
+        self.clock: Optional[ServerClock] = None
+        self._metrics_log = None
+        self._session = None
+        self._reconnecting = None
+
+        if auto_reconnect:
+            self.socket.on_closed = self._on_closed
+            self.stream.dispatcher.on_closed = self._on_closed
 
     async def __aenter__(self):
         return self
@@ -13,20 +58,257 @@ class XAPI:
     async def __aexit__(self, *args):
         await self.disconnect()
 
+    async def open(self, accountId: str, password: str, socket_url: str, stream_url: str):
+        """Connects both connections, logs in and passes the new streamSessionId to the stream."""
+
+        self.closed = False
+
+        await self.socket.connect(socket_url)
+        await self.stream.connect(stream_url)
+
+        result = await self.socket.login(accountId, password)
+        if result['status'] != True:
+            raise LoginFailed(result)
+
+        self.stream.streamSessionId = result['streamSessionId']
+        # Only a session that was opened once is re-opened on a drop.
+        self._session = (accountId, password, socket_url, stream_url)
+
+    async def reconnect(self, reason: str = "requested") -> ReconnectRecord:
+        """
+        Re-opens the session with exponential backoff, logs in again and re-issues every active stream subscription.
+        Concurrent callers share the same reconnect.
+
+        Raises
+        ------
+        `LoginFailed`
+            Raised when the new log in is refused.
+        `ConnectionClosed`
+            Raised when `max_attempts` connection attempts failed.
+        """
+
+        if self._reconnecting is None:
+            self._reconnecting = asyncio.ensure_future(self._reconnect(reason))
+        try:
+            return await asyncio.shield(self._reconnecting)
+        finally:
+            if self._reconnecting is not None and self._reconnecting.done():
+                self._reconnecting = None
+
+    async def _reconnect(self, reason: str) -> ReconnectRecord:
+        if self._session is None:
+            raise ConnectionClosed("Never connected")
+
+        started, start = time.time(), time.monotonic()
+        last_message = self.stream.dispatcher.last_message
+        delay = self.backoff_initial
+        attempts = 0
+
+        while True:
+            attempts += 1
+            await self.socket.disconnect()
+            await self.stream.disconnect()
+
+            try:
+                await self.open(*self._session)
+                await self.stream.resubscribe()
+                break
+            except ConnectionClosed as e:
+                if self.max_attempts is not None and attempts >= self.max_attempts:
+                    raise
+                self.logger.info(f"Reconnect attempt {attempts} failed: {e}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff_max)
+
+        end = time.monotonic()
+        record = ReconnectRecord(
+            started=started,
+            duration=end - start,
+            attempts=attempts,
+            gap=end - last_message if last_message is not None else None,
+            reason=reason
+        )
+        self.reconnects.append(record)
+        self.logger.info(f"Reconnected after {record.duration:.3f}s in {attempts} attempt(s): {reason}")
+        return record
+
+    async def _on_closed(self, error: Exception) -> bool:
+        """
+        Called by the stream dispatcher when the stream drops and by socket commands that find the socket dropped,
+        returns whether the session was restored.
+        """
+
+        # The log in of a reconnect runs on the socket too, a failure there is left to the reconnect's retries.
+        if self.closed or self._session is None or asyncio.current_task() is self._reconnecting:
+            return False
+        await self.reconnect(str(error))
+        return True
+
+    async def start_heartbeat(self, idle: float = 30.0, keep_alive_timeout: float = 10.0) -> Heartbeat:
+        """Starts pinging idle connections and watching stream keep-alive messages, see `Heartbeat`."""
+
+        if self.heartbeat is None:
+            self.heartbeat = Heartbeat(self, idle=idle, keep_alive_timeout=keep_alive_timeout)
+        await self.heartbeat.start()
+        return self.heartbeat
+
+    async def start_clock(self, interval: float = 60.0) -> ServerClock:
+        """Starts estimating the server time from periodic getServerTime samples, see `ServerClock`."""
+
+        if self.clock is None:
+            self.clock = ServerClock(self.socket, interval=interval)
+        await self.clock.start()
+        return self.clock
+
+    def health(self) -> dict:
+        """Returns the connection health snapshots of the socket session(s) and the stream, and of the server clock if started."""
+
+        sockets = getattr(self.socket, "sockets", [self.socket])
+        health = {
+            "socket": [socket.health.snapshot() for socket in sockets],
+            "stream": self.stream.health.snapshot(),
+        }
+        if self.clock is not None:
+            health["clock"] = self.clock.snapshot()
+        return health
+
+    def metrics(self) -> dict:
+        """Returns the per command latency and size metrics of the socket session(s) and the stream, see `ConnectionMetrics`."""
+
+        sockets = getattr(self.socket, "sockets", [self.socket])
+        snapshot = {f"socket[{index}]" if len(sockets) > 1 else "socket": socket.metrics.snapshot() for index, socket in enumerate(sockets)}
+        snapshot["stream"] = self.stream.metrics.snapshot()
+        return snapshot
+
+    def start_metrics_log(self, interval: float = 60.0):
+        """Logs a p50/p99 summary of `metrics()` every `interval` seconds until disconnected."""
+
+        if self._metrics_log is None or self._metrics_log.done():
+            self._metrics_log = asyncio.create_task(log_metrics(self.metrics, interval))
+
+    def start_capture(self, path: str):
+        """Appends every frame received by the socket session(s) and the stream to a capture file, see `capture.replay`."""
+
+        from .capture import FrameRecorder
+
+        self.stop_capture()
+        recorder = FrameRecorder(path)
+        for connection in getattr(self.socket, "sockets", [self.socket]) + [self.stream]:
+            connection.recorder = recorder
+        return recorder
+
+    def stop_capture(self):
+        for connection in getattr(self.socket, "sockets", [self.socket]) + [self.stream]:
+            if connection.recorder is not None:
+                connection.recorder.close()
+            connection.recorder = None
+
     async def disconnect(self):
         """
         This is an asynchronous function that closes connection to the xStation5 trading platform.
         """
 
+        self.closed = True
+        self.stop_capture()
+        if self.heartbeat is not None:
+            await self.heartbeat.stop()
+        if self.clock is not None:
+            await self.clock.stop()
+        if self._metrics_log is not None:
+            self._metrics_log.cancel()
+            self._metrics_log = None
         await self.socket.disconnect()
         await self.stream.disconnect()
 
+
+class SocketPool:
+    """
+    Spreads Socket commands over several logged in sessions, each with its own rate limiter.
+    Any Socket coroutine (e.g. `getChartRangeRequest`, `getSymbol`) can be called on the pool and runs on the session with the fewest commands in flight,
+    so independent calls issued concurrently with `asyncio.gather` are executed in parallel.
+    """
+
+    def __init__(self, sockets: List[Socket]):
+        self.sockets = sockets
+        self._in_flight = [0] * len(sockets)
+
+    @property
+    def safe(self) -> bool:
+        return self.sockets[0].safe
+
+    @safe.setter
+    def safe(self, value: bool):
+        for socket in self.sockets:
+            socket.safe = value
+
+    @property
+    def in_flight(self) -> List[int]:
+        """Number of commands currently running on each session."""
+        return list(self._in_flight)
+
+    async def connect(self, url):
+        await asyncio.gather(*(socket.connect(url) for socket in self.sockets))
+
+    async def disconnect(self):
+        await asyncio.gather(*(socket.disconnect() for socket in self.sockets))
+
+    async def login(self, accountId: str, password: str):
+        """Logs in every session and returns the first failed response, or the response of the first session."""
+
+        results = await asyncio.gather(*(socket.login(accountId, password) for socket in self.sockets))
+        return next((result for result in results if result['status'] != True), results[0])
+
+    async def run(self, method: str, *args, **kwargs):
+        """Runs a Socket coroutine by name on the least busy session."""
+
+        index = min(range(len(self.sockets)), key=self._in_flight.__getitem__)
+        self._in_flight[index] += 1
+        try:
+            return await getattr(self.sockets[index], method)(*args, **kwargs)
+        finally:
+            self._in_flight[index] -= 1
+
+    def __getattr__(self, name):
+        attribute = getattr(Socket, name)
+        if inspect.iscoroutinefunction(attribute):
+            return functools.partial(self.run, name)
+        return getattr(self.sockets[0], name)
+
+
+class XAPIPool(XAPI):
+    """
+    An XAPI with `sessions` logged in socket connections behind `socket` and a single stream connection.
+    The stream shares the rate limiter of the first session.
+    """
+
+    def __init__(self, sessions: int, multiplexed: bool = False, limiter: RateLimiter = None, codec: Codec = None,
+                 auto_reconnect: bool = False):
+        if not 1 <= sessions <= MAX_POOL_SESSIONS:
+            raise ValueError(f"sessions must be between 1 and {MAX_POOL_SESSIONS}")
+
+        super().__init__(multiplexed=multiplexed, limiter=limiter, codec=codec, auto_reconnect=auto_reconnect)
+        self.sessions = [self.socket] + [
+            Socket(multiplexed=multiplexed, limiter=RateLimiter(self.limiter.rate, self.limiter.burst), codec=codec)
+            for _ in range(sessions - 1)
+        ]
+        self.socket = SocketPool(self.sessions)
+        if auto_reconnect:
+            for socket in self.sessions:
+                socket.on_closed = self._on_closed
+
 async def connect(
         accountId: str,
         password: str,
         host: str = "ws.xtb.com",
         type: str = "real",
-        safe: bool = False
+        safe: bool = False,
+        multiplexed: bool = False,
+        limiter: RateLimiter = None,
+        codec: Codec = None,
+        sessions: int = 1,
+        auto_reconnect: bool = False,
+        heartbeat: bool = False,
+        capture: str = None
     ):
     """
     This is an asynchronous function that establishes a connection to the xStation5 trading platform.
@@ -43,11 +325,28 @@ async def connect(
         A type of the xStation5 account, which can be either `real` or `demo` (default is `real`)
     `safe` : `boolean`, `optional`
         A parameter indicating whether the connection should disallow trade execution (default is `False`)
+    `multiplexed` : `boolean`, `optional`
+        A parameter indicating whether socket commands are pipelined and matched to their responses by `customTag`,
+        so that many commands can be in flight at once (default is `False`)
+    `limiter` : `RateLimiter`, `optional`
+        The priority token bucket shared by the socket and stream connections (default is 5 requests per second with a burst of 5)
+    `codec` : `Codec`, `optional`
+        The JSON codec used to encode commands and decode responses (default is the fastest installed backend)
+    `sessions` : `int`, `optional`
+        The number of socket sessions to log in, more than one returns an `XAPIPool` that runs independent commands in parallel (default is `1`)
+    `auto_reconnect` : `boolean`, `optional`
+        A parameter indicating whether a dropped stream or socket re-opens the session with backoff and replays its
+        subscriptions, socket commands that could not be sent are sent again, see `XAPI.reconnect` (default is `False`)
+    `heartbeat` : `boolean`, `optional`
+        A parameter indicating whether idle connections are pinged and stream keep-alive messages watched in the background,
+        see `XAPI.start_heartbeat` (default is `False`)
+    `capture` : `str`, `optional`
+        A file path to record every received frame to, replayable with `capture.replay` (default is `None`)
 
     Returns
     -------
     `XAPI`
-        An object of XAPI that can be utilized to communicate with the xStation 5 trading platform.
+        An object of XAPI (or `XAPIPool` when `sessions` > 1) that can be utilized to communicate with the xStation 5 trading platform.
 
     Raises
     ------
@@ -57,7 +356,10 @@ async def connect(
         Raised when a connection has never been opened or closed unexpectedly.
     """
 
-    x = XAPI()
+    if sessions > 1:
+        x = XAPIPool(sessions, multiplexed=multiplexed, limiter=limiter, codec=codec, auto_reconnect=auto_reconnect)
+    else:
+        x = XAPI(multiplexed=multiplexed, limiter=limiter, codec=codec, auto_reconnect=auto_reconnect)
 
     x.stream.safe = safe
     x.socket.safe = safe
@@ -68,12 +370,10 @@ async def connect(
     socket_url = f"{host}/{type}"
     stream_url = f"{host}/{type}Stream"
 
-    await x.socket.connect(socket_url)
-    await x.stream.connect(stream_url)
-
-    result = await x.socket.login(accountId, password)
-    if result['status'] != True:
-        raise LoginFailed(result)
+    if capture is not None:
+        x.start_capture(capture)
 
-    x.stream.streamSessionId = result['streamSessionId']
+    await x.open(accountId, password, socket_url, stream_url)
+    if heartbeat:
+        await x.start_heartbeat()
     return x
\ No newline at end of file
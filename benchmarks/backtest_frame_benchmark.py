@@ -0,0 +1,100 @@
+"""
+Before/after benchmark of the backtest frame preprocessing in Client.get_backtest_ohlcv_data.
+
+"before" is the former pipeline: read the CSV, parse ctmString with strptime, split Date/Time and rebuild the prices
+with a hard-coded /1000. "after" opens the memory-mapped store series and builds the frame from ctm and digits, then
+the same call with the frame cache warm on disk (a new process) and in memory (a repeated backtest).
+
+Usage:
+    python -m benchmarks.backtest_frame_benchmark [--bars 30000 1000000] [--repeat 3]
+"""
+
+import argparse
+import tempfile
+import time
+import os
+
+import numpy as np
+import pandas as pd
+
+from algotrading.constants import BACKTEST_CANDLES
+from algotrading.xtb.xapi import PeriodCode
+from algotrading.xtb.xapi.columnar import ChartColumns
+from algotrading.xtb.xapi.framecache import FrameCache
+from algotrading.xtb.xapi.store import ColumnStore, read_rate_info_csv
+
+
+def write_csv(path: str, bars: int):
+    """Writes `bars` M15 GBPJPY-like candles in the backtest CSV layout."""
+
+    rng = np.random.default_rng(1)
+    ctm = 1683151200000 + np.arange(bars, dtype=np.int64) * 900000
+    open = 169000 + np.cumsum(rng.integers(-50, 51, bars))
+    ctm_string = pd.to_datetime(ctm, unit="ms", utc=True).tz_convert("Europe/Berlin").strftime("%b %d, %Y, %I:%M:%S %p")
+    pd.DataFrame({
+        "ctmString": ctm_string, "ctm": ctm, "open": open.astype(float), "high": rng.integers(0, 200, bars).astype(float),
+        "low": -rng.integers(0, 200, bars).astype(float), "close": rng.integers(-150, 150, bars).astype(float),
+        "vol": rng.integers(1, 10000, bars).astype(float),
+    }).to_csv(path, index=False)
+
+
+def before(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df = df.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'vol': 'Volume'})
+    df = df.drop(['ctm'], axis=1)
+    df['ctmString'] = pd.to_datetime(df['ctmString'], format='%b %d, %Y, %I:%M:%S %p')
+    df['Date'] = df['ctmString'].dt.date
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Time'] = df['ctmString'].dt.time
+    df.drop(columns={'ctmString'}, inplace=True)
+    df.set_index('Date', inplace=True)
+    df.insert(0, 'Time', df.pop('Time'))
+    df['High'] = (df['Open'] + (df['High'])) / 1000
+    df['Low'] = (df['Open'] + (df['Low'])) / 1000
+    df['Close'] = (df['Open'] + (df['Close'])) / 1000
+    df['Open'] = (df['Open']) / 1000
+    return df
+
+
+def after(store: ColumnStore, frames: FrameCache) -> pd.DataFrame:
+    return frames.get(store.open("GBPJPY", PeriodCode.PERIOD_M15).between(), ChartColumns.to_ohlcv_frame)
+
+
+def best_of(repeat: int, run, setup=lambda: None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args):
+    print(f"{'bars':>10}{'before':>12}{'after':>12}{'disk cache':>12}{'memory':>12}   (ms, best of {args.repeat})")
+    for bars in args.bars:
+        with tempfile.TemporaryDirectory() as directory:
+            csv = os.path.join(directory, "latest.csv")
+            write_csv(csv, bars)
+            store = ColumnStore(os.path.join(directory, "store"))
+            store.write("GBPJPY", PeriodCode.PERIOD_M15, read_rate_info_csv(csv, 3))
+            store.compact("GBPJPY", PeriodCode.PERIOD_M15)
+            path = os.path.join(directory, "frames")
+
+            pd.testing.assert_frame_equal(before(csv), after(store, FrameCache(path)), check_index_type=False, check_exact=False)
+
+            frames = FrameCache(path)
+            timings = [
+                best_of(args.repeat, lambda: before(csv)),
+                best_of(args.repeat, lambda: after(store, frames), lambda: frames.clear(disk=True)),
+                best_of(args.repeat, lambda: after(store, frames), frames.clear),
+                best_of(args.repeat, lambda: after(store, frames)),
+            ]
+            print(f"{bars:>10}" + "".join(f"{timing * 1000:>12.1f}" for timing in timings))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, nargs="+", default=[BACKTEST_CANDLES, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,96 @@
+"""
+Benchmark of the xapi JSON codecs, reporting the decode time per message type for every installed backend.
+
+Usage:
+    python -m benchmarks.codec_benchmark [--candles 25000] [--repeat 20]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from algotrading.xtb.xapi.codec import available_codecs, get_codec
+
+
+def chart_response(candles: int) -> str:
+    """A getChartLastRequest response, 25000 candles is roughly a year of M15 bars."""
+    ctm = 1667260800000
+    rate_infos = []
+    for _ in range(candles):
+        rate_infos.append({
+            "ctm": ctm,
+            "ctmString": "Nov 1, 2022, 12:00:00 AM",
+            "open": random.randint(150000, 170000),
+            "close": random.randint(-200, 200),
+            "high": random.randint(0, 300),
+            "low": random.randint(-300, 0),
+            "vol": float(random.randint(1, 5000))
+        })
+        ctm += 900000
+    return json.dumps({"status": True, "returnData": {"digits": 3, "rateInfos": rate_infos}})
+
+
+def symbol_response() -> str:
+    return json.dumps({"status": True, "returnData": {
+        "ask": 186.221, "bid": 186.194, "categoryName": "FX", "contractSize": 100000, "currency": "GBP",
+        "currencyPair": True, "currencyProfit": "JPY", "description": "British Pound to Japanese Yen",
+        "expiration": None, "groupName": "Major", "high": 186.5, "initialMargin": 0, "instantMaxVolume": 0,
+        "leverage": 3.33, "longOnly": False, "lotMax": 100.0, "lotMin": 0.01, "lotStep": 0.01, "low": 185.8,
+        "marginHedged": 0, "marginHedgedStrong": False, "marginMaintenance": 0, "marginMode": 101,
+        "percentage": 100.0, "pipsPrecision": 2, "precision": 3, "profitMode": 5, "quoteId": 10,
+        "quoteIdCross": 4, "shortSelling": True, "spreadRaw": 0.027, "spreadTable": 2.7, "starting": None,
+        "stepRuleId": 1, "stopsLevel": 0, "swap_rollover3days": 0, "swapEnable": True, "swapLong": -1.5,
+        "swapShort": -3.1, "swapType": 1, "symbol": "GBPJPY", "tickSize": 0.001, "tickValue": 0.54,
+        "time": 1699528740000, "timeString": "Thu Nov 09 12:19:00 CET 2023", "trailingEnabled": True,
+        "type": 21, "exemode": 1
+    }})
+
+
+def tick_message() -> str:
+    return json.dumps({"command": "tickPrices", "data": {
+        "ask": 186.221, "askVolume": 1000000, "bid": 186.194, "bidVolume": 1000000, "high": 186.5,
+        "level": 0, "low": 185.8, "quoteId": 2, "spreadRaw": 0.027, "spreadTable": 2.7,
+        "symbol": "GBPJPY", "timestamp": 1699528740000
+    }})
+
+
+def server_time_response() -> str:
+    return json.dumps({"status": True, "returnData": {"time": 1699528740000, "timeString": "Nov 9, 2023, 12:19:00 PM"}})
+
+
+def measure(decode, message, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(message)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candles", type=int, default=25000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    messages = {
+        "getChartLastRequest": chart_response(args.candles),
+        "getSymbol": symbol_response(),
+        "getServerTime": server_time_response(),
+        "tickPrices": tick_message(),
+    }
+
+    print(f"{'codec':<18}" + "".join(f"{name:>22}" for name in messages))
+    for name in available_codecs():
+        for typed in (False, True):
+            codec = get_codec(name, typed_charts=typed)
+            row = f"{name + (' typed' if typed else ''):<18}"
+            for command, message in messages.items():
+                seconds = measure(lambda m: codec.decode(m, command), message, args.repeat)
+                row += f"{seconds * 1e6:>19.1f} us"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
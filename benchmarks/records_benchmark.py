@@ -0,0 +1,79 @@
+"""
+Construction cost and memory per record of the slotted records against plain dataclasses and the raw dicts.
+
+Builds StreamTickRecord, StreamingCandleRecord, RateInfoRecord and SymbolRecord objects from response dicts as
+produced by the MockXTBServer, once with a plain (un-slotted) dataclass of the same fields and keyword expansion,
+once with the slotted record and keyword expansion and once with `from_dict`.
+
+Usage:
+    python -m benchmarks.records_benchmark [--records 200000] [--repeat 5]
+"""
+
+import argparse
+import dataclasses
+import time
+import tracemalloc
+
+from algotrading.xtb.xapi.mockserver import MockXTBServer, random_walk_ticks
+from algotrading.xtb.xapi.records import RateInfoRecord, StreamingCandleRecord, StreamTickRecord, SymbolRecord
+
+
+def plain(record) -> type:
+    """Returns an un-slotted dataclass with the fields of `record`, i.e. the records before slots."""
+    return dataclasses.make_dataclass(f"Plain{record.__name__}", [(field.name, field.type, field) for field in dataclasses.fields(record)])
+
+
+def responses(record, count: int) -> list:
+    server = MockXTBServer()
+    now = 1700000000000
+    if record is StreamTickRecord:
+        ticks = random_walk_ticks()
+        return [ticks("EURUSD", now + index) for index in range(count)]
+    if record is StreamingCandleRecord:
+        return [{"close": 1.1, "ctm": now + index * 60000, "ctmString": str(now), "high": 1.2, "low": 1.0, "open": 1.1,
+                 "quoteId": 2, "symbol": "EURUSD", "vol": 1.0} for index in range(count)]
+    if record is RateInfoRecord:
+        server.chart_candles = count
+        return server.chart(1, 0, now)["rateInfos"]
+    return [server.symbol_record("EURUSD", now + index) for index in range(count)]
+
+
+def best_of(repeat: int, build) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bytes_per_record(build, count: int) -> float:
+    tracemalloc.start()
+    records = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return size / count
+
+
+def main(args):
+    print(f"{'record':<24}{'variant':<20}{'ns/record':>12}{'bytes/record':>14}")
+    for record in (StreamTickRecord, StreamingCandleRecord, RateInfoRecord, SymbolRecord):
+        data = responses(record, args.records)
+        Plain = plain(record)
+        variants = {
+            "dataclass(**data)": lambda: [Plain(**item) for item in data],
+            "slotted(**data)": lambda: [record(**item) for item in data],
+            "slotted.from_dict": lambda: [record.from_dict(item) for item in data],
+        }
+        for name, build in variants.items():
+            elapsed = best_of(args.repeat, build)
+            size = bytes_per_record(build, len(data))
+            print(f"{record.__name__:<24}{name:<20}{elapsed / len(data) * 1e9:>12.0f}{size:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+"""
+Scaling of the MultiSymbolRuntime with the number of symbols, against the local MockXTBServer.
+
+For every symbol count one session subscribes the ticks of all symbols and runs for `--seconds`. Reports the ticks
+processed per second, the CPU time of the process per tick and per symbol, the batch processing time and the memory
+held per symbol (table columns, SymbolRecords, subscriptions and pending ticks, measured with tracemalloc). The mock
+server runs in the same process, so the CPU figures include producing and sending the ticks.
+
+Usage:
+    python -m benchmarks.runtime_benchmark [--symbols 10 100 500 1000] [--tick-rate 5] [--seconds 5]
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from algotrading.xtb.runtime import MultiSymbolRuntime
+from algotrading.xtb.xapi import connect
+from algotrading.xtb.xapi.mockserver import MockXTBServer
+from algotrading.xtb.xapi.ratelimit import RateLimiter
+
+
+async def run(server: MockXTBServer, symbols: int, seconds: float) -> dict:
+    x = await connect("1", "password", host=server.url, type="demo", limiter=RateLimiter(rate=1e9, burst=1 << 30))
+    names = [f"SYM{index:04d}" for index in range(symbols)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    runtime = MultiSymbolRuntime(x, names, interval=0.05)
+    await runtime.start()
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(seconds)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    stats = runtime.stats()
+    await runtime.stop()
+    await x.disconnect()
+    return {"stats": stats, "cpu": cpu, "wall": wall, "memory": memory}
+
+
+async def main(args):
+    print(f"{'symbols':>8}{'ticks/s':>10}{'cpu %':>8}{'us cpu/tick':>13}{'batch p50':>11}{'batch p99':>11}{'bytes/symbol':>14}")
+    async with MockXTBServer(tick_rate=args.tick_rate) as server:
+        for symbols in args.symbols:
+            result = await run(server, symbols, args.seconds)
+            stats = result["stats"]
+            ticks = max(stats["ticks"], 1)
+            print(f"{symbols:>8}{ticks / result['wall']:>10,.0f}{result['cpu'] / result['wall'] * 100:>8.1f}"
+                  f"{result['cpu'] / ticks * 1e6:>13.1f}{stats['batch_time']['p50'] * 1000:>9.2f}ms"
+                  f"{stats['batch_time']['p99'] * 1000:>9.2f}ms{result['memory'] / symbols:>14,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--tick-rate", type=float, default=5.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
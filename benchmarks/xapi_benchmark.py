@@ -0,0 +1,98 @@
+"""
+End-to-end benchmark of the xapi client against the local MockXTBServer.
+
+Reports socket command latency, chart download time, stream tick throughput across many symbols and reconnect time
+under repeated connection drops.
+
+Usage:
+    python -m benchmarks.xapi_benchmark [--symbols 200] [--tick-rate 20] [--seconds 5] [--candles 50000] [--drops 10]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from algotrading.xtb.xapi import connect, PeriodCode
+from algotrading.xtb.xapi.mockserver import MockXTBServer
+from algotrading.xtb.xapi.metrics import format_snapshot
+from algotrading.xtb.xapi.ratelimit import RateLimiter
+
+
+def unlimited() -> RateLimiter:
+    """The mock server has no request limit, so benchmarks measure the client instead of the token bucket."""
+    return RateLimiter(rate=1e9, burst=1 << 30)
+
+
+async def socket_latency(server: MockXTBServer, requests: int, multiplexed: bool):
+    x = await connect("1", "password", host=server.url, type="demo", multiplexed=multiplexed, limiter=unlimited())
+    start = time.perf_counter()
+    await asyncio.gather(*(x.socket.getServerTime() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{requests} x getServerTime (multiplexed={multiplexed}): {requests / elapsed:,.0f} req/s")
+    print(format_snapshot({"getServerTime": x.metrics()["socket"]["getServerTime"]}))
+    await x.disconnect()
+
+
+async def chart_download(server: MockXTBServer, candles: int):
+    server.chart_candles = candles
+    x = await connect("1", "password", host=server.url, type="demo", limiter=unlimited())
+    start = time.perf_counter()
+    response = await x.socket.getChartLastRequest("EURUSD", 0, PeriodCode.PERIOD_M1)
+    elapsed = time.perf_counter() - start
+    print(f"getChartLastRequest of {len(response['returnData']['rateInfos']):,} candles: {elapsed * 1000:.1f} ms")
+    server.chart_candles = None
+    await x.disconnect()
+
+
+async def tick_throughput(server: MockXTBServer, symbols: int, seconds: float):
+    x = await connect("1", "password", host=server.url, type="demo", limiter=unlimited())
+    received = [0]
+
+    def on_tick(data):
+        received[0] += 1
+
+    for index in range(symbols):
+        await x.stream.getTickPrices(f"SYM{index:04d}", callback=on_tick)
+
+    await asyncio.sleep(seconds)
+    print(f"{symbols} symbols at {server.tick_rate:g} ticks/s each: {received[0] / seconds:,.0f} ticks/s received "
+          f"({server.ticks_sent / seconds:,.0f} sent)")
+    await x.disconnect()
+
+
+async def reconnect_storm(server: MockXTBServer, drops: int):
+    x = await connect("1", "password", host=server.url, type="demo", auto_reconnect=True, limiter=unlimited())
+    await x.stream.getTickPrices("EURUSD", conflate=True)
+    x.stream.dispatcher.start()
+    await asyncio.sleep(0.1)
+
+    for _ in range(drops):
+        await server.drop_connections()
+        while len(x.reconnects) < _ + 1:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.05)
+
+    durations = [record.duration * 1000 for record in x.reconnects]
+    print(f"{drops} dropped connections: reconnect p50 {statistics.median(durations):.2f} ms, max {max(durations):.2f} ms")
+    await x.disconnect()
+
+
+async def main(args):
+    async with MockXTBServer(tick_rate=args.tick_rate) as server:
+        await socket_latency(server, args.requests, multiplexed=False)
+        await socket_latency(server, args.requests, multiplexed=True)
+        await chart_download(server, args.candles)
+        await tick_throughput(server, args.symbols, args.seconds)
+        await reconnect_storm(server, args.drops)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--tick-rate", type=float, default=20.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--candles", type=int, default=50000)
+    parser.add_argument("--drops", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
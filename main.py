@@ -32,7 +32,7 @@ async def run_xtb_client(**credentials):
                     
                     ## Request backtesting data if needed
                     if GET_NEW_HISTORICAL_DATA == True:
-                        historical_data = await client.get_last_request_data(
+                        historical_data = await client.update_historical_data(
                             connector,
                             symbol=client.symbol,
                             period=TRADE_PERIOD,
@@ -42,9 +42,6 @@ async def run_xtb_client(**credentials):
                         
                         # print(historical_data)
                     
-                        # Write new data locally if enabled
-                        client.write_backtest_ohlcv_data(historical_data)
-                    
                     ## Get DataFrame
                     # date_range = pd.date_range(start="2023-10-10", end="2023-11-10", freq='15T') ## freq is 15 minutes.
                     df = await client.get_backtest_ohlcv_data()
@@ -80,7 +77,7 @@ async def run_xtb_client(**credentials):
                 raise exceptions.ConnectionClosed
             else:
                 client.logger.info("Connection lost: timed out. Reconnecting...")
-                asyncio.sleep(0.2)
+                await asyncio.sleep(0.2)
                 continue
         except exceptions.ConnectionClosed:
             await connector.disconnect()
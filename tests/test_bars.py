@@ -0,0 +1,57 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from algotrading.xtb.xapi.bars import BarBuilder, bar_start, bar_starts
+from algotrading.xtb.xapi.clock import CET
+from algotrading.xtb.xapi.enums import PeriodCode
+
+
+def closed_bars(day: datetime.date) -> BarBuilder:
+    """Feeds one candle of volume 1 per minute from the day before `day` to the day after into a BarBuilder."""
+
+    start = int(datetime.datetime(day.year, day.month, day.day, tzinfo=CET).timestamp() * 1000) - 86400000
+    builder = BarBuilder("GBPJPY", partial=False, history=10000)
+    for ctm in range(start, start + 3 * 86400000 + 60000, 60000):
+        builder.update(ctm, 1.0, 2.0, 0.5, 1.5, 1.0)
+    return builder
+
+
+@pytest.mark.parametrize("day, hours", [(datetime.date(2026, 3, 29), 23), (datetime.date(2026, 10, 25), 25)])
+def test_dst_change(day, hours):
+    builder = closed_bars(day)
+
+    # Intraday bars stay on the epoch grid and always hold period minutes, also across the change.
+    for period in (PeriodCode.PERIOD_M1, PeriodCode.PERIOD_M15, PeriodCode.PERIOD_H1, PeriodCode.PERIOD_H4):
+        bars = builder.closed[period]
+        assert all(bar.vol == period.value for bar in list(bars)[1:])
+        assert all(bar.ctm % (period.value * 60000) == 0 for bar in bars)
+        assert all(b.ctm - a.ctm == period.value * 60000 for a, b in zip(bars, list(bars)[1:]))
+
+    # Days start at midnight CET / CEST, the day of the change is an hour shorter or longer.
+    days = {datetime.datetime.fromtimestamp(bar.ctm / 1000, CET).date(): bar for bar in builder.closed[PeriodCode.PERIOD_D1]}
+    assert all(datetime.datetime.fromtimestamp(bar.ctm / 1000, CET).hour == 0 for bar in days.values())
+    assert days[day].vol == hours * 60
+
+
+@pytest.mark.parametrize("change, wall_hours", [
+    (datetime.datetime(2026, 3, 29, 1, tzinfo=datetime.timezone.utc), 5),
+    (datetime.datetime(2026, 10, 25, 1, tzinfo=datetime.timezone.utc), 3),
+])
+def test_h4_bar_spanning_dst_change(change, wall_hours):
+    builder = closed_bars(change.date())
+    when = int(change.timestamp() * 1000)
+    bar = next(bar for bar in builder.closed[PeriodCode.PERIOD_H4] if bar.ctm <= when < bar.ctm + 4 * 3600000)
+
+    # The bar starts at 00:00 UTC on the epoch grid and holds four hours of candles, its wall time is stretched or cut.
+    assert bar.ctm == when - 3600000
+    assert bar.vol == 240
+    start, end = (datetime.datetime.fromtimestamp(ctm / 1000, CET).replace(tzinfo=None) for ctm in (bar.ctm, bar.ctm + 4 * 3600000))
+    assert end - start == datetime.timedelta(hours=wall_hours)
+
+
+def test_bar_starts_matches_bar_start():
+    ctm = np.arange(1774648800000, 1774648800000 + 5 * 86400000, 7 * 60000, dtype=np.int64)
+    for period in PeriodCode:
+        assert bar_starts(ctm, period).tolist() == [bar_start(int(t), period) for t in ctm]
@@ -0,0 +1,20 @@
+import asyncio
+
+from algotrading.xtb.xapi import connect
+from algotrading.xtb.xapi.mockserver import MockXTBServer
+
+
+def test_late_reply_of_abandoned_request_is_dropped():
+    async def run():
+        async with MockXTBServer(latency=0.1) as server:
+            x = await connect("1", "password", host=server.url, type="demo", multiplexed=True)
+            try:
+                await asyncio.wait_for(x.socket.getSymbol("GBPJPY"), 0.05)
+            except asyncio.TimeoutError:
+                pass
+            response = await x.socket.getServerTime()
+            await x.disconnect()
+            return response
+
+    response = asyncio.run(run())
+    assert set(response["returnData"]) == {"time", "timeString"}
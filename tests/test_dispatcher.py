@@ -0,0 +1,34 @@
+import asyncio
+
+from algotrading.xtb.xapi.dispatcher import StreamDispatcher
+
+
+class FakeStream:
+    """Stands in for a Stream connection that sends `messages` and closes."""
+
+    def __init__(self, messages):
+        self._conn = None
+        self.messages = messages
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+
+
+def test_raising_callback_does_not_stop_other_subscriptions():
+    ticks = [{"command": "tickPrices", "data": {"symbol": "GBPJPY", "bid": bid}} for bid in (1.0, 2.0, 3.0)]
+    received = []
+
+    def fail(data):
+        raise ValueError("bad consumer")
+
+    async def run():
+        dispatcher = StreamDispatcher(FakeStream(ticks))
+        dispatcher.subscribe("tickPrices", "GBPJPY", callback=fail)
+        dispatcher.subscribe("tickPrices", "GBPJPY", callback=received.append)
+        await dispatcher._task
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert [data["bid"] for data in received] == [1.0, 2.0, 3.0]
+    assert dispatcher.errors == 3
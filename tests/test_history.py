@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+import numpy as np
+
+from algotrading.xtb.xapi import connect
+from algotrading.xtb.xapi.enums import PeriodCode, TimeInt
+from algotrading.xtb.xapi.history import HistoryCache
+from algotrading.xtb.xapi.mockserver import MockXTBServer
+from algotrading.xtb.xapi.store import ColumnStore
+
+
+def test_first_fill_stores_coarser_candles_under_their_own_period(tmp_path):
+    now = int(time.time() * 1000)
+    cache = HistoryCache(ColumnStore(str(tmp_path)))
+
+    async def run():
+        async with MockXTBServer() as server:
+            x = await connect("1", "password", host=server.url, type="demo")
+            columns, _ = await cache.refresh(x.socket, "GBPJPY", PeriodCode.PERIOD_M15, now - TimeInt.YEARS, now=now)
+            await x.disconnect()
+            return columns
+
+    columns = asyncio.run(run())
+    for period in (PeriodCode.PERIOD_M15, PeriodCode.PERIOD_M30, PeriodCode.PERIOD_H4):
+        stored = cache.store.read_chart("GBPJPY", period, now - TimeInt.YEARS)
+        assert len(stored)
+        assert set(np.diff(stored.ctm)) == {period * 60000}
+    assert np.array_equal(columns.ctm, cache.store.read_chart("GBPJPY", PeriodCode.PERIOD_M15, now - TimeInt.YEARS).ctm)
@@ -0,0 +1,23 @@
+import asyncio
+
+from algotrading.xtb.xapi.enums import RequestPriority
+from algotrading.xtb.xapi.ratelimit import RateLimiter
+
+
+def test_queued_requests_are_released_by_priority_then_fifo():
+    lanes = [RequestPriority.HISTORY, RequestPriority.MARKET, RequestPriority.HISTORY, RequestPriority.ACCOUNT,
+             RequestPriority.MARKET, RequestPriority.TRADE]
+    released = []
+
+    async def request(limiter, index, priority):
+        await limiter.acquire(priority)
+        released.append(index)
+
+    async def run():
+        limiter = RateLimiter(rate=100.0, burst=1)
+        await limiter.acquire()
+        # The bucket is empty, so every request is queued before the first one is released.
+        await asyncio.gather(*(request(limiter, index, priority) for index, priority in enumerate(lanes)))
+
+    asyncio.run(run())
+    assert released == [5, 3, 1, 4, 0, 2]
@@ -0,0 +1,23 @@
+import asyncio
+
+import pytest
+
+from algotrading.xtb.xapi import connect
+from algotrading.xtb.xapi.mockserver import MockXTBServer
+
+
+@pytest.mark.parametrize("multiplexed", [False, True])
+def test_dropped_socket_without_subscriptions_recovers(multiplexed):
+    async def run():
+        async with MockXTBServer() as server:
+            x = await connect("1", "password", host=server.url, type="demo", multiplexed=multiplexed, auto_reconnect=True)
+            await server.drop_connections()
+            await asyncio.sleep(0.05)
+            responses = [await x.socket.getServerTime(), await x.socket.getSymbol("GBPJPY")]
+            await x.disconnect()
+            return x, server, responses
+
+    x, server, responses = asyncio.run(run())
+    assert len(x.reconnects) == 1
+    assert server.logins == 2
+    assert all(response["status"] for response in responses)